@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+
+# Admission outcomes
+ADMITTED = "admitted"
+DEGRADED = "degraded"
+SHED = "shed"
+# Crisis request over its limits: answered with the static crisis template, no generation
+TEMPLATE_ONLY = "template_only"
+
+
+class TokenBucket:
+    """Refills at `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def consume(self, now=None):
+        """Take one token. Returns (allowed, seconds until a token is available)"""
+        now = now if now is not None else time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0
+        return False, (1 - self.tokens) / self.rate
+
+
+class Admission:
+    """Result of an admission decision, passed back to release()"""
+
+    def __init__(self, status, reason=None, retry_after=0, queue_wait=0.0, counted=False):
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+        self.queue_wait = queue_wait
+        self.counted = counted
+
+    @property
+    def shed(self):
+        return self.status == SHED
+
+    @property
+    def degraded(self):
+        return self.status == DEGRADED
+
+    @property
+    def template_only(self):
+        return self.status == TEMPLATE_ONLY
+
+
+class AdmissionController:
+    """
+    Bounds the number of in-flight requests and the queue of requests waiting for a slot,
+    and rate-limits each client with a token bucket.
+
+    Requests that get a slot immediately are served normally. Requests that had to wait in
+    the queue are served in degraded mode. Requests that find the queue full, time out
+    waiting, or exceed their client's rate are shed.
+
+    Crisis requests are never shed, but they are charged to the client's bucket and may
+    additionally use crisis_slots reserved in-flight slots. Past either limit they are
+    admitted as template-only: answered with static crisis resources and no generation work.
+    """
+
+    def __init__(self, max_inflight=4, max_queue=16, queue_timeout=5.0,
+                 client_rate=1.0, client_burst=5, max_clients=10000, crisis_slots=4):
+        self.max_inflight = max_inflight
+        self.crisis_slots = crisis_slots
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._waiting = 0
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+
+        self._admitted = 0
+        self._degraded = 0
+        self._template_only = {}
+        self._shed = {}
+        self._queue_wait_total = 0.0
+        self._queue_wait_count = 0
+        self._queue_wait_max = 0.0
+
+    def admit(self, client_id, is_crisis=False):
+        allowed, retry_after = self._consume_client_token(client_id)
+        if is_crisis:
+            return self._admit_crisis(allowed)
+        if not allowed:
+            return self._record_shed("rate_limited", retry_after)
+
+        with self._cond:
+            if self._inflight < self.max_inflight:
+                self._inflight += 1
+                self._admitted += 1
+                return Admission(ADMITTED, counted=True)
+
+            if self._waiting >= self.max_queue:
+                return self._record_shed("queue_full", self.queue_timeout, locked=True)
+
+            self._waiting += 1
+            start = time.monotonic()
+            deadline = start + self.queue_timeout
+            try:
+                while self._inflight >= self.max_inflight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            waited = time.monotonic() - start
+            self._queue_wait_total += waited
+            self._queue_wait_count += 1
+            self._queue_wait_max = max(self._queue_wait_max, waited)
+
+            if self._inflight >= self.max_inflight:
+                return self._record_shed("queue_timeout", self.queue_timeout, locked=True)
+
+            self._inflight += 1
+            self._degraded += 1
+            return Admission(DEGRADED, queue_wait=waited, counted=True)
+
+    def _admit_crisis(self, allowed):
+        with self._cond:
+            if not allowed:
+                reason = "rate_limited"
+            elif self._inflight >= self.max_inflight + self.crisis_slots:
+                reason = "capacity"
+            else:
+                self._inflight += 1
+                self._admitted += 1
+                return Admission(ADMITTED, reason="crisis", counted=True)
+            self._template_only[reason] = self._template_only.get(reason, 0) + 1
+            return Admission(TEMPLATE_ONLY, reason=reason)
+
+    def release(self, admission):
+        if not admission.counted:
+            return
+        with self._cond:
+            self._inflight -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "inflight": self._inflight,
+                "queued": self._waiting,
+                "max_inflight": self.max_inflight,
+                "max_queue": self.max_queue,
+                "crisis_slots": self.crisis_slots,
+                "admitted_total": self._admitted,
+                "degraded_total": self._degraded,
+                "shed_total": sum(self._shed.values()),
+                "shed_by_reason": dict(self._shed),
+                "crisis_template_only_total": sum(self._template_only.values()),
+                "crisis_template_only_by_reason": dict(self._template_only),
+                "queue_wait_seconds_total": self._queue_wait_total,
+                "queue_wait_count": self._queue_wait_count,
+                "queue_wait_seconds_max": self._queue_wait_max,
+            }
+
+    def _record_shed(self, reason, retry_after, locked=False):
+        if locked:
+            self._shed[reason] = self._shed.get(reason, 0) + 1
+        else:
+            with self._cond:
+                self._shed[reason] = self._shed.get(reason, 0) + 1
+        return Admission(SHED, reason=reason, retry_after=max(1, int(retry_after + 0.999)))
+
+    def _consume_client_token(self, client_id):
+        with self._buckets_lock:
+            now = time.monotonic()
+            bucket = self._buckets.get(client_id)
+            if bucket is None:
+                if len(self._buckets) >= self.max_clients:
+                    self._evict_idle_buckets(now)
+                bucket = TokenBucket(self.client_rate, self.client_burst)
+                self._buckets[client_id] = bucket
+            return bucket.consume(now)
+
+    def _evict_idle_buckets(self, now):
+        # A bucket idle long enough to have refilled completely carries no state
+        refill_time = self.client_burst / self.client_rate
+        idle = [key for key, bucket in self._buckets.items() if now - bucket.updated > refill_time]
+        for key in idle:
+            del self._buckets[key]
+
+
+chat_admission = AdmissionController(
+    max_inflight=int(os.environ.get("CHAT_MAX_INFLIGHT", "4")),
+    max_queue=int(os.environ.get("CHAT_MAX_QUEUE", "16")),
+    queue_timeout=float(os.environ.get("CHAT_QUEUE_TIMEOUT", "5")),
+    client_rate=float(os.environ.get("CHAT_CLIENT_RATE", "1")),
+    client_burst=int(os.environ.get("CHAT_CLIENT_BURST", "5")),
+    crisis_slots=int(os.environ.get("CHAT_CRISIS_SLOTS", "4")),
+)
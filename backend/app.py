@@ -1,5 +1,11 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g, stream_with_context
+import time
+import uuid
 import os
+import contextvars
+import threading
+import itertools
+import io
 import json
 import torch
 import tarfile
@@ -12,22 +18,47 @@ from flask_cors import CORS
 from difflib import SequenceMatcher
 import database
 from database import get_all_therapists
+from inference import create_backend, build_model_prompt, GENERATION_KWARGS
+from crisis import detect_crisis, get_crisis_resources
+from history import history_writer, get_history
+from mood_trends import get_mood_trends
+import auth
+import bulk_io
+from json_provider import init_json_provider
+from compression import init_compression
+from generation_queue import generation_queue, followups, PRIORITY_CRISIS, PRIORITY_NORMAL, PRIORITY_BULK
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from admission import chat_admission
+from profiler import live_profiler, MODE_SAMPLE
+from metrics import (REGISTRY, Counter, Gauge, REQUEST_LATENCY, GENERATION_RETRIES, REPETITION_REJECTIONS,
+                     FALLBACKS, MODEL_LOADED, GEMINI_AVAILABLE, track_stage, timed_stage, render_metrics)
+from structured_logging import get_logger, request_id_var
+
+logger = get_logger(__name__)
 
 # Load environment variables (for API keys)
 load_dotenv()
 
 app = Flask(__name__)
+init_json_provider(app)
+init_compression(app)
 # Allow all origins with all methods and headers
 CORS(app, resources={r"/*": {"origins": "*", "methods": ["GET", "POST", "OPTIONS"], "allow_headers": "*"}})
 
 # Configure Gemini API
-genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
+# GEMINI_API_ENDPOINT points the client at another server (e.g. the fake Gemini in bench/)
+gemini_endpoint = os.environ.get("GEMINI_API_ENDPOINT")
+if gemini_endpoint:
+    genai.configure(api_key=os.environ.get("GEMINI_API_KEY"), transport="rest",
+                    client_options={"api_endpoint": gemini_endpoint})
+else:
+    genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
 
 # Try to get available models first
 try:
     available_models = genai.list_models()
     models = [model.name for model in available_models]
-    print(f"Available Gemini models: {models}")
+    logger.debug("Available Gemini models: %s", models)
     
     # Try to find the best matching model for text generation
     preferred_models = ["gemini-2.0-flash", "gemini-1.5-pro", "gemini-pro"]
@@ -47,15 +78,33 @@ try:
         selected_model = models[0]
         
     if selected_model:
-        print(f"Using Gemini model: {selected_model}")
+        logger.info("Using Gemini model: %s", selected_model)
         gemini_model = genai.GenerativeModel(selected_model)
     else:
-        print("No suitable Gemini models found, refinement will be skipped")
+        logger.warning("No suitable Gemini models found, refinement will be skipped")
         gemini_model = None
 except Exception as e:
-    print(f"Error listing Gemini models: {e}")
+    logger.error("Error listing Gemini models: %s", e)
     gemini_model = None
 
+# Token required in the X-Admin-Token header for admin-only endpoints (disabled when unset)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+def admin_authorized():
+    """Check the admin token on the current request"""
+    import hmac
+    provided = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(provided, ADMIN_TOKEN)
+
+# Maximum concurrent Gemini calls across all bulk scoring jobs in this process
+BULK_GEMINI_CONCURRENCY = int(os.environ.get("BULK_GEMINI_CONCURRENCY", "4"))
+bulk_gemini_slots = threading.BoundedSemaphore(BULK_GEMINI_CONCURRENCY)
+
+def bulk_gemini_call(fn, *args):
+    """Run a Gemini call for bulk scoring once one of the shared slots is free"""
+    with bulk_gemini_slots:
+        return fn(*args)
+
 # Store recent responses to avoid repetition
 recent_responses = []
 
@@ -76,35 +125,35 @@ def load_model():
     
     # Check if extraction is needed
     if os.path.exists(model_dir) and os.path.isdir(model_dir):
-        print(f"Model already extracted at {model_dir}, skipping extraction")
+        logger.info("Model already extracted at %s, skipping extraction", model_dir)
         
         # Verify if the extracted model has the necessary files
         if (os.path.exists(os.path.join(model_dir, "pytorch_model.bin")) or
             os.path.exists(os.path.join(model_dir, "config.json"))):
-            print("Found extracted model files, proceeding to load model")
+            logger.debug("Found extracted model files, proceeding to load model")
         else:
-            print("Extracted model directory exists but files are missing, will re-extract")
+            logger.warning("Extracted model directory exists but files are missing, will re-extract")
             # If files are missing, force re-extraction
             try:
                 shutil.rmtree(extracted_dir)
                 os.makedirs(extracted_dir, exist_ok=True)
             except Exception as e:
-                print(f"Error cleaning extraction directory: {e}")
+                logger.error("Error cleaning extraction directory: %s", e)
                 return None
     else:
         # Check if the model file exists
         if not os.path.exists(model_path):
-            print(f"Model file not found at: {model_path}")
+            logger.warning("Model file not found at: %s", model_path)
             return None
         
         # Create extraction directory if it doesn't exist
         os.makedirs(extracted_dir, exist_ok=True)
     
         try:
-            print(f"Extracting model from {model_path} to {extracted_dir}")
+            logger.info("Extracting model from %s to %s", model_path, extracted_dir)
             # For Windows, use a safer extraction method
             if os.name == 'nt':  # Check if running on Windows
-                print("Using Windows-safe extraction method")
+                logger.debug("Using Windows-safe extraction method")
                 with tarfile.open(model_path, "r") as tar:
                     for member in tar.getmembers():
                         try:
@@ -126,22 +175,20 @@ def load_model():
                                     with open(target_path, 'wb') as out_file:
                                         out_file.write(f.read())
                             except OSError as e:
-                                print(f"Error extracting file {member.name}: {e}")
+                                logger.warning("Error extracting file %s: %s", member.name, e)
                                 # Skip this file and continue with others
                                 continue
                         except Exception as e:
-                            print(f"Error processing {member.name}: {e}")
+                            logger.warning("Error processing %s: %s", member.name, e)
                             continue
             else:
                 # Non-Windows extraction
                 with tarfile.open(model_path, "r") as tar:
                     tar.extractall(path=extracted_dir)
                 
-            print(f"Model extraction completed")
+            logger.info("Model extraction completed")
         except Exception as e:
-            print(f"Error extracting model: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error extracting model: %s", e)
             return None
     
     try:
@@ -161,21 +208,21 @@ def load_model():
                 if (os.path.exists(os.path.join(dir_path, "pytorch_model.bin")) or
                     os.path.exists(os.path.join(dir_path, "config.json"))):
                     valid_model_dir = dir_path
-                    print(f"Found model files in: {valid_model_dir}")
+                    logger.debug("Found model files in: %s", valid_model_dir)
                     break
         
         if valid_model_dir is None:
-            print("Could not find valid model directory in extracted contents")
+            logger.error("Could not find valid model directory in extracted contents")
             return None
         
         # Load tokenizer and model
-        print(f"Loading model from {valid_model_dir}")
+        logger.info("Loading model from %s", valid_model_dir)
         tokenizer = T5Tokenizer.from_pretrained(valid_model_dir, legacy=False)
         model = T5ForConditionalGeneration.from_pretrained(valid_model_dir)
         
         # Move model to GPU if available
         device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        print(f"Using device: {device}")
+        logger.info("Using device: %s", device)
         model = model.to(device)
         model.eval()  # Set model to evaluation mode
         
@@ -183,19 +230,18 @@ def load_model():
             "model": model,
             "tokenizer": tokenizer,
             "device": device,
+            "source": valid_model_dir,
         }
     except Exception as e:
-        print(f"Error loading model: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error loading model: %s", e)
         return None
 
 # Alternative way to load model if the tar approach fails
-def load_model_direct():
+def load_model_direct(model_id="t5-small"):
     try:
-        print("Attempting to load model directly using the pre-trained model ID")
-        tokenizer = T5Tokenizer.from_pretrained("t5-small", legacy=False)
-        model = T5ForConditionalGeneration.from_pretrained("t5-small")
+        logger.info("Attempting to load model directly from %s", model_id)
+        tokenizer = T5Tokenizer.from_pretrained(model_id, legacy=False)
+        model = T5ForConditionalGeneration.from_pretrained(model_id)
         
         device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         model = model.to(device)
@@ -205,46 +251,253 @@ def load_model_direct():
             "model": model,
             "tokenizer": tokenizer,
             "device": device,
+            "source": model_id,
         }
     except Exception as e:
-        print(f"Error loading model directly: {e}")
+        logger.error("Error loading model directly: %s", e)
         return None
 
 # Try to load from tar file first, fall back to direct loading
-model_data = load_model()
+# MODEL_DIR loads a model directory directly (e.g. the tiny stand-in model from bench/)
+if os.environ.get("MODEL_DIR"):
+    model_data = load_model_direct(os.environ["MODEL_DIR"])
+else:
+    model_data = load_model()
 if model_data is None:
-    print("Falling back to direct model loading...")
+    logger.warning("Falling back to direct model loading")
+    FALLBACKS.inc(kind="direct_model_load")
     model_data = load_model_direct()
 
-@app.route('/chat', methods=['POST'])
-def chat():
-    data = request.json
-    user_message = data.get('message', '')
-    user_emotion = data.get('emotion', 'Neutral')
-    
+# Select the inference engine (torch or onnx) for generate calls
+if model_data is not None:
+    model_data["backend"] = create_backend(model_data)
+    logger.info("Using inference backend: %s", model_data['backend'].name)
+
+MODEL_LOADED.set_function(lambda: 1 if model_data is not None else 0)
+GEMINI_AVAILABLE.set_function(lambda: 1 if gemini_model is not None else 0)
+
+def collect_admission_metrics():
+    """Expose the /chat admission controller state in Prometheus format"""
+    stats = chat_admission.stats()
+    inflight = Gauge("mental_health_chat_inflight", "Admitted /chat requests currently being served")
+    inflight.set(stats["inflight"])
+    queued = Gauge("mental_health_chat_queued", "/chat requests waiting for an in-flight slot")
+    queued.set(stats["queued"])
+    shed = Counter("mental_health_chat_shed_total", "/chat requests shed by admission control",
+                   labelnames=("reason",))
+    for reason, count in stats["shed_by_reason"].items():
+        shed.inc(count, reason=reason)
+    degraded = Counter("mental_health_chat_degraded_total", "/chat requests served without refinement")
+    degraded.inc(stats["degraded_total"])
+    template_only = Counter("mental_health_chat_crisis_template_only_total",
+                            "Crisis /chat requests answered with the static template because they were over their limits",
+                            labelnames=("reason",))
+    for reason, count in stats["crisis_template_only_by_reason"].items():
+        template_only.inc(count, reason=reason)
+    queue_wait = Counter("mental_health_chat_queue_wait_seconds_total", "Total time /chat requests spent queued")
+    queue_wait.inc(stats["queue_wait_seconds_total"])
+    return [inflight, queued, shed, degraded, template_only, queue_wait]
+
+REGISTRY.register_collector(collect_admission_metrics)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    # Reuse the caller's request id if given so logs can be correlated across services
+    request_id_var.set(request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16])
+
+@app.after_request
+def record_request_latency(response):
+    start = getattr(g, 'request_start', None)
+    if start is not None:
+        REQUEST_LATENCY.observe(time.perf_counter() - start,
+                                endpoint=request.url_rule.rule if request.url_rule else 'unmatched',
+                                method=request.method,
+                                status=response.status_code)
+    if request.path == '/chat':
+        live_profiler.request_finished()
+    response.headers['X-Request-ID'] = request_id_var.get()
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of latency histograms, counters and gauges"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+# Answer high-confidence crisis messages immediately and deliver the personalized reply as a follow-up
+CRISIS_FAST_PATH = os.environ.get("CRISIS_FAST_PATH", "true").lower() == "true"
+CRISIS_FAST_PATH_THRESHOLD = 0.8
+
+# Threads that build deferred crisis replies; only their model generate step goes through generation_queue
+followup_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("FOLLOWUP_WORKERS", "4")),
+                                   thread_name_prefix="followup")
+
+CRISIS_RESOURCES_MESSAGE = (
+    "I'm really glad you reached out, and I want to make sure you're safe right now. "
+    "You don't have to go through this alone - please contact one of these services for immediate help:\n\n"
+    "{resources}\n\n"
+    "If you are in immediate danger, please call your local emergency number."
+)
+
+# Fast-path reply; the personalized reply follows via /chat/followup
+CRISIS_TEMPLATE_MESSAGE = CRISIS_RESOURCES_MESSAGE + " I'm still here with you and will reply to your message in a moment."
+
+def build_chat_reply(user_message, user_emotion, refine=True, priority=PRIORITY_NORMAL):
+    """
+    Run mood analysis, model generation and Gemini refinement for one message.
+    The Gemini calls run on the calling thread; only the model generate step is queued, at the given priority.
+    With refine=False (degraded mode under load) the model response is returned unrefined.
+    """
     # Analyze mood with Gemini for a more nuanced understanding
     gemini_detected_mood = analyze_mood_with_gemini(user_message)
     
     # Use Gemini's mood if available, otherwise fall back to user's reported mood
     effective_emotion = gemini_detected_mood or user_emotion
     
-    # Check for crisis indicators first
-    is_crisis, crisis_type, crisis_score = detect_crisis(user_message)
-    
     # Step 1: Generate initial response from your trained model
-    initial_response = generate_model_response(user_message, effective_emotion)
+    initial_response = generate_model_response(user_message, effective_emotion, priority=priority)
     
     # Step 2: Refine the response with Gemini
-    refined_response = refine_with_gemini(user_message, initial_response, effective_emotion)
+    if refine:
+        refined_response = refine_with_gemini(user_message, initial_response, effective_emotion)
+    else:
+        refined_response = initial_response
     
-    response_data = {
+    return {
         'response': refined_response,
         'detected_mood': gemini_detected_mood
     }
+
+class AuthError(Exception):
+    pass
+
+def require_user_id():
+    """
+    Identify the caller from a Bearer token, validated in memory without a DB lookup.
+    Raises AuthError if the token is missing, invalid, expired or revoked.
+    """
+    token = auth.token_from_header(request.headers.get('Authorization'))
+    if token is None:
+        raise AuthError('Authentication required')
+    payload = auth.verify_token(token)
+    if payload is None:
+        raise AuthError('Invalid or expired token')
+    return payload['uid']
+
+def optional_user_id():
+    """
+    User to store a /chat exchange under: the token's user if a Bearer token is sent, otherwise
+    None and the exchange is not stored. A client-supplied user_id is never trusted, since it
+    would share the namespace that token-backed reads return.
+    Raises AuthError if a token is present but invalid, expired or revoked.
+    """
+    if auth.token_from_header(request.headers.get('Authorization')) is None:
+        return None
+    return require_user_id()
+
+def record_exchange(user_id, user_message, response_data, created_at=None):
+    """Queue a chat exchange for the write-behind history store (anonymous chats are not kept)"""
+    if not user_id:
+        return
+    history_writer.record(
+        user_id,
+        user_message,
+        response_data.get('response'),
+        detected_mood=response_data.get('detected_mood'),
+        crisis_detected=response_data.get('crisis_detected', False),
+        crisis_type=response_data.get('crisis_type'),
+        crisis_score=response_data.get('crisis_score'),
+        created_at=created_at
+    )
+
+@app.route('/chat', methods=['POST'])
+def chat():
+    data = request.json
+    user_message = data.get('message', '')
+    user_emotion = data.get('emotion', 'Neutral')
+    try:
+        user_id = optional_user_id()
+    except AuthError as e:
+        return jsonify({'error': str(e)}), 401
+    
+    # Check for crisis indicators first (keyword matching only, no model calls)
+    is_crisis, crisis_type, crisis_score = detect_crisis(user_message)
+    
+    # Admission control: crisis messages are never shed, but over their limits they get the template only
+    # Rate-limit per verified user, else per address; the body's user_id is client-controlled and never used
+    client_id = f"user:{user_id}" if user_id else request.remote_addr
+    admission = chat_admission.admit(client_id, is_crisis=is_crisis)
+    if admission.shed:
+        logger.info("Shedding /chat request", extra={"fields": {"client_id": client_id, "reason": admission.reason}})
+        response = jsonify({
+            'error': 'The server is busy right now. Please try again shortly.',
+            'reason': admission.reason,
+            'retry_after': admission.retry_after
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(admission.retry_after)
+        return response
+    
+    if admission.template_only:
+        logger.warning("Crisis request over limits, sending template only", extra={"fields": {
+            "client_id": client_id, "reason": admission.reason, "crisis_type": crisis_type}})
+        crisis_resources = get_crisis_resources(crisis_type)
+        response_data = {
+            'response': CRISIS_RESOURCES_MESSAGE.format(resources=crisis_resources),
+            'detected_mood': None,
+            'crisis_detected': True,
+            'crisis_type': crisis_type,
+            'crisis_score': crisis_score,
+            'crisis_resources': crisis_resources
+        }
+        record_exchange(user_id, user_message, response_data)
+        return jsonify(response_data)
+    
+    # Crisis fast path: reply with resources now, generate the personalized reply in the background
+    if is_crisis and CRISIS_FAST_PATH and crisis_score > CRISIS_FAST_PATH_THRESHOLD:
+        received_at = time.time()
+        crisis_resources = get_crisis_resources(crisis_type)
+        future = followup_pool.submit(contextvars.copy_context().run, build_chat_reply, user_message, user_emotion,
+                                      priority=PRIORITY_CRISIS)
+        followup_id = followups.add(future)
+        logger.warning("Crisis fast path", extra={"fields": {
+            "crisis_type": crisis_type, "crisis_score": crisis_score, "followup_id": followup_id}})
+        
+        response_data = {
+            'response': CRISIS_TEMPLATE_MESSAGE.format(resources=crisis_resources),
+            'detected_mood': None,
+            'crisis_detected': True,
+            'crisis_type': crisis_type,
+            'crisis_score': crisis_score,
+            'crisis_resources': crisis_resources,
+            'followup_id': followup_id
+        }
+        
+        # The admission slot is held until the follow-up is done.
+        # Store one row per message: the personalized reply once generated, or the template if that fails
+        def finish_followup(done):
+            chat_admission.release(admission)
+            final = response_data
+            if done.exception() is None:
+                final = dict(done.result(), crisis_detected=True, crisis_type=crisis_type, crisis_score=crisis_score)
+            record_exchange(user_id, user_message, final, created_at=received_at)
+        future.add_done_callback(finish_followup)
+        
+        return jsonify(response_data)
+    
+    try:
+        priority = PRIORITY_CRISIS if is_crisis else PRIORITY_NORMAL
+        response_data = build_chat_reply(user_message, user_emotion, refine=not admission.degraded,
+                                         priority=priority)
+    finally:
+        chat_admission.release(admission)
+    refined_response = response_data['response']
+    if admission.degraded:
+        response_data['degraded'] = True
     
     # Add crisis information if detected
     if is_crisis:
-        print(f"Crisis detected: {crisis_type} with confidence {crisis_score}")
+        logger.warning("Crisis detected", extra={"fields": {"crisis_type": crisis_type, "crisis_score": crisis_score}})
         crisis_resources = get_crisis_resources(crisis_type)
         
         response_data.update({
@@ -255,47 +508,176 @@ def chat():
         })
         
         # For high confidence crisis, prioritize immediate help
-        if crisis_score > 0.8:
+        if crisis_score > CRISIS_FAST_PATH_THRESHOLD:
             response_data['response'] = f"I notice you may be going through something serious. Please consider these resources for immediate help:\n\n{crisis_resources}\n\nRegarding your message: {refined_response}"
     
+    record_exchange(user_id, user_message, response_data)
     return jsonify(response_data)
 
-def generate_model_response(user_message, emotion=None, max_retries=3):
+@app.route('/mood_trends', methods=['GET'])
+def mood_trends():
+    """
+    Mood counts per day or week for the authenticated user (Authorization: Bearer <token>),
+    answered from the rollup table.
+    Query params: period ('day' or 'week', default 'day'), periods (default 7, max 90).
+    """
+    try:
+        user_id = require_user_id()
+    except AuthError as e:
+        return jsonify({'success': False, 'error': str(e)}), 401
+    
+    try:
+        periods = min(max(int(request.args.get('periods', 7)), 1), 90)
+        trends = get_mood_trends(user_id, period=request.args.get('period', 'day'), periods=periods)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    if trends is None:
+        return jsonify({'success': False, 'error': 'Database error'}), 500
+    return jsonify(dict(trends, success=True))
+
+@app.route('/history', methods=['GET'])
+def history():
+    """
+    Newest-first chat history of the authenticated user (Authorization: Bearer <token>).
+    Query params: limit (default 50, max 200), cursor (next_cursor from the previous page).
+    """
+    try:
+        user_id = require_user_id()
+    except AuthError as e:
+        return jsonify({'success': False, 'error': str(e)}), 401
+    
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+        page = get_history(user_id, cursor=request.args.get('cursor'), limit=limit)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid limit or cursor'}), 400
+    
+    if page is None:
+        return jsonify({'success': False, 'error': 'Database error'}), 500
+    return jsonify(dict(page, success=True))
+
+@app.route('/admission_stats', methods=['GET'])
+def admission_stats():
+    """Current in-flight/queue state, queue wait times and shed counts for /chat"""
+    return jsonify(chat_admission.stats())
+
+@app.route('/admin/profile/start', methods=['POST'])
+def admin_profile_start():
+    """
+    Start a profiling session without restarting the process.
+    Body: {"mode": "sample"|"torch", "seconds": N, "requests": K, "interval_ms": 5}
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        seconds = float(data['seconds']) if data.get('seconds') is not None else None
+        requests_count = int(data['requests']) if data.get('requests') is not None else None
+        interval = float(data.get('interval_ms', 5)) / 1000
+        if seconds is None and requests_count is None:
+            seconds = 10.0
+        # Cap sessions so a forgotten profiler does not run forever
+        seconds = min(seconds, 300.0) if seconds is not None else 300.0
+        live_profiler.start(mode=data.get('mode', MODE_SAMPLE), seconds=seconds,
+                            requests=requests_count, interval=max(interval, 0.001))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    
+    return jsonify(live_profiler.status())
+
+@app.route('/admin/profile/stop', methods=['POST'])
+def admin_profile_stop():
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    live_profiler.stop()
+    return jsonify(live_profiler.status())
+
+@app.route('/admin/profile/status', methods=['GET'])
+def admin_profile_status():
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(live_profiler.status())
+
+@app.route('/admin/profile/result', methods=['GET'])
+def admin_profile_result():
+    """
+    Collapsed stacks of the last session (feed to flamegraph.pl or speedscope).
+    ?format=torch returns the torch.profiler operator tables instead.
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    if request.args.get('format') == 'torch':
+        return Response("\n\n".join(live_profiler.torch_tables()), mimetype='text/plain')
+    return Response(live_profiler.collapsed_stacks(), mimetype='text/plain')
+
+@app.route('/chat/followup/<followup_id>', methods=['GET'])
+def chat_followup(followup_id):
+    """
+    Fetch the deferred reply for a crisis fast-path message.
+    Pass ?wait=<seconds> to long-poll until the reply is ready.
+    """
+    future = followups.get(followup_id)
+    if future is None:
+        return jsonify({'status': 'unknown', 'error': 'Follow-up not found or expired'}), 404
+    
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0), 25)
+    except ValueError:
+        wait = 0
+    
+    try:
+        result = future.result(timeout=wait)
+    except FutureTimeoutError:
+        return jsonify({'status': 'pending', 'followup_id': followup_id}), 202
+    except Exception as e:
+        logger.error("Error generating follow-up reply: %s", e)
+        followups.pop(followup_id)
+        return jsonify({
+            'status': 'done',
+            'response': "I'm here for you. Please reach out to one of the services above if you need to talk to someone right now.",
+            'detected_mood': None
+        })
+    
+    followups.pop(followup_id)
+    return jsonify(dict(result, status='done'))
+
+def run_generation(input_ids, attention_mask):
+    """Model generate call; runs on a generation_queue worker"""
+    with track_stage("generation"), live_profiler.generate_context():
+        return model_data["backend"].generate(
+            input_ids,
+            attention_mask=attention_mask,
+            **GENERATION_KWARGS
+        )
+
+def generate_model_response(user_message, emotion=None, max_retries=3, priority=PRIORITY_NORMAL):
     if model_data is None:
+        FALLBACKS.inc(kind="model_unavailable")
         return "I'm sorry, but I'm having trouble accessing my knowledge. Please try again later."
     
     try:
-        # Format input for T5 model with improved prompt
-        prompt = (
-            f"Respond in a professional, empathetic, and clear manner to this mental health question:\n\n"
-            f"Question: {user_message}\n\n"
-        )
+        prompt = build_model_prompt(user_message, emotion)
         
-        if emotion:
-            prompt += f"User emotion: {emotion}\n\n"
+        for attempt in range(max_retries):
+            if attempt > 0:
+                GENERATION_RETRIES.inc()
             
-        prompt += "Response:"
-        
-        for _ in range(max_retries):
             # Tokenize input
-            inputs = model_data["tokenizer"](prompt, return_tensors="pt").to(model_data["device"])
+            with track_stage("tokenization"):
+                inputs = model_data["tokenizer"](prompt, return_tensors="pt").to(model_data["device"])
             
-            # Generate response
-            with torch.no_grad():
-                output = model_data["model"].generate(
-                    inputs.input_ids,
-                    max_length=150,
-                    temperature=0.8,  # Add some randomness
-                    top_p=0.92,       # Control diversity
-                    do_sample=True,
-                    repetition_penalty=2.0,  # Prevent repetition
-                    num_beams=4,
-                    early_stopping=True,
-                    no_repeat_ngram_size=2
-                )
+            # Generate response (crisis requests jump ahead in the queue)
+            output = generation_queue.submit(run_generation, inputs.input_ids, inputs.attention_mask,
+                                             priority=priority).result()
             
             # Decode response
-            response = model_data["tokenizer"].decode(output[0], skip_special_tokens=True)
+            with track_stage("decoding"):
+                response = model_data["tokenizer"].decode(output[0], skip_special_tokens=True)
             
             # Ensure response is meaningful and not repetitive
             if len(response.split()) > 5 and not is_repetitive(response):
@@ -303,21 +685,146 @@ def generate_model_response(user_message, emotion=None, max_retries=3):
                 if len(recent_responses) > 5:
                     recent_responses.pop(0)
                 return response
+            REPETITION_REJECTIONS.inc()
         
+        FALLBACKS.inc(kind="generation_retries_exhausted")
         return f"I understand you're asking about: {user_message}. How can I help you with that specifically?"
     except Exception as e:
-        print(f"Error generating model response: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error generating model response: %s", e)
+        FALLBACKS.inc(kind="generation_error")
         return f"I'm processing your message about: {user_message}"
 
+def generate_model_responses(user_messages, emotions, priority=PRIORITY_NORMAL):
+    """
+    Batched variant of generate_model_response for bulk scoring: one padded generate call
+    for the whole batch, no retries, and recent_responses is left untouched.
+    """
+    if model_data is None:
+        FALLBACKS.inc(kind="model_unavailable")
+        return ["I'm sorry, but I'm having trouble accessing my knowledge. Please try again later."] * len(user_messages)
+    
+    prompts = [build_model_prompt(message, emotion) for message, emotion in zip(user_messages, emotions)]
+    try:
+        with track_stage("tokenization"):
+            inputs = model_data["tokenizer"](prompts, return_tensors="pt", padding=True).to(model_data["device"])
+        
+        output = generation_queue.submit(run_generation, inputs.input_ids, inputs.attention_mask,
+                                         priority=priority).result()
+        
+        with track_stage("decoding"):
+            responses = model_data["tokenizer"].batch_decode(output, skip_special_tokens=True)
+    except Exception as e:
+        logger.exception("Error generating batched model responses: %s", e)
+        FALLBACKS.inc(kind="generation_error")
+        return [f"I'm processing your message about: {message}" for message in user_messages]
+    
+    return [response if len(response.split()) > 5
+            else f"I understand you're asking about: {message}. How can I help you with that specifically?"
+            for message, response in zip(user_messages, responses)]
+
+def score_messages(records, batch_size=16, gemini_concurrency=4, refine=False):
+    """
+    Run crisis detection, mood analysis and generation over an iterable of records
+    ({"message": ..., "emotion": ..., "id": ...}) in padded batches.
+    Gemini calls run on at most gemini_concurrency threads per job, and at most BULK_GEMINI_CONCURRENCY
+    at once across all jobs. Records carrying an "error" are passed through unscored.
+    Results are yielded in input order.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, gemini_concurrency), thread_name_prefix="bulk-gemini") as gemini_pool:
+        for batch in iter_batches(records, batch_size):
+            valid = [record for record in batch if 'error' not in record]
+            messages = [str(record.get('message', '')) for record in valid]
+            
+            scored = iter([])
+            if valid:
+                crisis_results = [detect_crisis(message) for message in messages]
+                moods = list(gemini_pool.map(bulk_gemini_call, itertools.repeat(analyze_mood_with_gemini), messages))
+                emotions = [mood or record.get('emotion', 'Neutral') for mood, record in zip(moods, valid)]
+                
+                # Bulk work queues behind interactive chat requests
+                responses = generate_model_responses(messages, emotions, priority=PRIORITY_BULK)
+                if refine:
+                    responses = list(gemini_pool.map(bulk_gemini_call, itertools.repeat(refine_with_gemini),
+                                                     messages, responses, emotions))
+                scored = zip(crisis_results, moods, responses)
+            
+            for record in batch:
+                if 'error' in record:
+                    result = {'message': record.get('message', ''), 'error': record['error']}
+                else:
+                    (is_crisis, crisis_type, crisis_score), mood, response = next(scored)
+                    result = {
+                        'message': record.get('message', ''),
+                        'response': response,
+                        'detected_mood': mood,
+                        'crisis_detected': is_crisis,
+                        'crisis_type': crisis_type,
+                        'crisis_score': crisis_score
+                    }
+                if 'id' in record:
+                    result['id'] = record['id']
+                yield result
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_jsonl(lines):
+    """Parse JSONL lines (bytes or str), skipping blanks; malformed lines become error records"""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            record = {'message': '', 'error': f'Invalid JSON: {e}'}
+        if isinstance(record, str):
+            record = {'message': record}
+        elif not isinstance(record, dict):
+            record = {'message': '', 'error': 'Each line must be a JSON object or string'}
+        yield record
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    Bulk scoring for evaluation/QA jobs. The body is streamed JSONL, one
+    {"message": ..., "emotion": ..., "id": ...} per line; results stream back as JSONL in order.
+    Query params: batch_size (default 16), refine (default false).
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    try:
+        batch_size = min(max(int(request.args.get('batch_size', 16)), 1), 64)
+    except ValueError:
+        return jsonify({'error': 'batch_size must be an integer'}), 400
+    refine = request.args.get('refine', 'false').lower() == 'true'
+    
+    def generate():
+        for result in score_messages(iter_jsonl(request.stream), batch_size=batch_size,
+                                     gemini_concurrency=BULK_GEMINI_CONCURRENCY, refine=refine):
+            yield app.json.dumps(result) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@timed_stage("refinement")
 def refine_with_gemini(user_message, initial_response, emotion=None):
     # Check for crisis
     is_crisis, crisis_type, _ = detect_crisis(user_message)
     
     # If Gemini is not available, return the initial response
     if gemini_model is None:
-        print("Gemini model not available, returning initial response")
+        logger.debug("Gemini model not available, returning initial response")
+        FALLBACKS.inc(kind="refinement_unavailable")
         return initial_response
         
     # Add crisis information to the prompt if detected
@@ -354,7 +861,8 @@ def refine_with_gemini(user_message, initial_response, emotion=None):
         response = gemini_model.generate_content(prompt)
         return response.text
     except Exception as e:
-        print(f"Error with Gemini API: {e}")
+        logger.error("Error with Gemini API: %s", e)
+        FALLBACKS.inc(kind="refinement_error")
         return initial_response
 
 @app.route('/inspect_model', methods=['GET'])
@@ -387,6 +895,7 @@ def inspect_model_route():
             results["extracted_dir_error"] = str(e)
     
     results["model_loaded"] = model_data is not None
+    results["inference_backend"] = model_data["backend"].name if model_data is not None else None
     
     return jsonify(results)
 
@@ -449,11 +958,9 @@ def get_resources():
                 filename = os.path.join(resources_dir, f"scraped_data_{i+1}.txt")
                 scrape_website(url, filename)
             
-            print("Web scraping completed")
+            logger.info("Web scraping completed")
         except Exception as e:
-            print(f"Error during web scraping: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error during web scraping: %s", e)
     
     # Load resources from files
     for i in range(1, 6):  # 5 resources
@@ -476,9 +983,9 @@ def get_resources():
                     "content": content
                 })
             else:
-                print(f"Resource file not found: {filename}")
+                logger.warning("Resource file not found: %s", filename)
         except Exception as e:
-            print(f"Error loading resource {i}: {e}")
+            logger.error("Error loading resource %s: %s", i, e)
     
     return jsonify({
         "resources": resources,
@@ -496,16 +1003,16 @@ def register():
     password = data.get('password')
     name = data.get('name')
     
-    print(f"Attempting to register user: {email}, {name}")
+    logger.info("Attempting to register user", extra={"fields": {"email": email, "name": name}})
     
     if not all([email, password, name]):
-        print("Missing required fields")
+        logger.info("Registration missing required fields")
         return jsonify({"success": False, "error": "Missing required fields"}), 400
     
     # Create new user
     try:
         result = database.create_user(email, password, name)
-        print(f"Registration result: {result}")
+        logger.info("Registration result", extra={"fields": {"success": result["success"], "error": result.get("error")}})
         
         if result["success"]:
             return jsonify({
@@ -519,32 +1026,97 @@ def register():
                 "error": result.get("error", "Registration failed")
             }), 400
     except Exception as e:
-        print(f"Exception during registration: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Exception during registration: %s", e)
         return jsonify({
             "success": False,
             "error": f"Registration error: {str(e)}"
         }), 500
 
+@app.route('/login', methods=['POST'])
+def login():
+    """Check credentials once and issue a signed, expiring token for later requests"""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"success": False, "error": "No data provided"}), 400
+    
+    email = data.get('email')
+    password = data.get('password')
+    if not email or not password:
+        return jsonify({"success": False, "error": "Missing required fields"}), 400
+    
+    user = auth.authenticate(email, password)
+    if user is None:
+        logger.info("Failed login attempt", extra={"fields": {"email": email}})
+        return jsonify({"success": False, "error": "Invalid email or password"}), 401
+    
+    logger.info("User logged in", extra={"fields": {"user_id": user["id"]}})
+    return jsonify({
+        "success": True,
+        "token": auth.issue_token(user),
+        "expires_in": auth.TOKEN_TTL,
+        "user": user
+    })
+
+@app.route('/logout', methods=['POST'])
+def logout():
+    """Revoke the caller's token"""
+    token = auth.token_from_header(request.headers.get('Authorization'))
+    if token is None or not auth.revoke_token(token):
+        return jsonify({"success": False, "error": "Invalid or expired token"}), 401
+    return jsonify({"success": True})
+
 # Add this new endpoint to list users (for debugging only)
 @app.route('/list_users', methods=['GET'])
 def list_users():
-    conn = database.create_connection()
-    if conn is not None:
-        try:
-            cur = conn.cursor()
-            cur.execute("SELECT id, email, name FROM users")
-            rows = cur.fetchall()
-            conn.close()
-            
-            users = [{"id": row[0], "email": row[1], "name": row[2]} for row in rows]
-            return jsonify({"success": True, "users": users})
-        except Exception as e:
-            conn.close()
-            return jsonify({"success": False, "error": str(e)})
-    else:
-        return jsonify({"success": False, "error": "Database connection failed"})
+    # Stream the JSON array row by row instead of building the whole list first
+    try:
+        rows = bulk_io.iter_export_rows("users")
+        first = next(rows, None)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
+    
+    def generate():
+        yield '{"success": true, "users": ['
+        if first is not None:
+            yield app.json.dumps(first)
+            for row in rows:
+                yield ',' + app.json.dumps(row)
+        yield ']}'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+@app.route('/import/<table>', methods=['POST'])
+def import_table(table):
+    """
+    Bulk-load therapists or users from a streamed CSV or JSONL body (admin only).
+    Query params: format ('csv' or 'jsonl', default 'jsonl').
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    if table not in bulk_io.TABLES:
+        return jsonify({'success': False, 'error': f'Unknown table: {table}'}), 404
+    
+    fmt = request.args.get('format', 'jsonl')
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    try:
+        result = bulk_io.import_records(table, bulk_io.iter_records(stream, fmt))
+    except (ValueError, KeyError) as e:
+        return jsonify({'success': False, 'error': f'Invalid input: {e}'}), 400
+    except Exception as e:
+        logger.exception("Error importing into %s: %s", table, e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify(dict(result, success=True))
+
+@app.route('/export/<table>', methods=['GET'])
+def export_table(table):
+    """Stream therapists or users as JSONL (admin only)"""
+    if not admin_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    if table not in bulk_io.TABLES:
+        return jsonify({'success': False, 'error': f'Unknown table: {table}'}), 404
+    
+    return Response(stream_with_context(bulk_io.export_jsonl(table)), mimetype='application/x-ndjson')
 
 # Add this new route
 @app.route('/therapists', methods=['GET'])
@@ -553,84 +1125,9 @@ def get_therapists():
         therapists = get_all_therapists()
         return jsonify(therapists)
     except Exception as e:
-        print(f"Error getting therapists: {e}")
+        logger.error("Error getting therapists: %s", e)
         return jsonify({"error": str(e)}), 500
 
-def detect_crisis(message):
-    """
-    Detects potential crisis indicators in user messages
-    Returns a tuple of (is_crisis, crisis_type, confidence_score)
-    """
-    # Crisis indicators (expand this list)
-    crisis_keywords = {
-        'suicide': ['kill myself', 'suicide', 'end my life', 'want to die', 'better off dead'],
-        'self_harm': ['cut myself', 'hurt myself', 'self harm', 'harming myself', 'burn myself'],
-        'violence': ['hurt someone', 'kill someone', 'attack', 'harm others'],
-        'immediate_danger': ['right now', 'tonight', 'plan to', 'going to']
-    }
-    
-    message = message.lower()
-    
-    # Check for crisis indicators
-    detected_categories = []
-    max_score = 0
-    
-    for category, keywords in crisis_keywords.items():
-        for keyword in keywords:
-            if keyword in message:
-                # Higher score for immediate danger terms
-                score = 0.7
-                if category == 'immediate_danger' or any(danger in message for danger in crisis_keywords['immediate_danger']):
-                    score = 0.9
-                
-                detected_categories.append(category)
-                max_score = max(max_score, score)
-    
-    is_crisis = len(detected_categories) > 0
-    crisis_type = ', '.join(set(detected_categories)) if detected_categories else None
-    
-    return (is_crisis, crisis_type, max_score)
-
-# Add this function to get crisis resources
-def get_crisis_resources(crisis_type=None):
-    """Returns crisis resources based on detected type"""
-    # Default crisis resources
-    general_resources = [
-        "National Suicide Prevention Lifeline: 1-800-273-8255 (24/7)",
-        "Crisis Text Line: Text HOME to 741741 (24/7)",
-        "SAMHSA's National Helpline: 1-800-662-HELP (4357)"
-    ]
-    
-    # Specialized resources based on crisis type
-    specialized_resources = {
-        "suicide": [
-            "National Suicide Prevention Lifeline: 1-800-273-8255",
-            "IMAlive Crisis Chat: www.imalive.org"
-        ],
-        "self_harm": [
-            "S.A.F.E. Alternatives: 1-800-DONT-CUT",
-            "Self-Harm Crisis Text Line: Text HOME to 741741"
-        ],
-        "violence": [
-            "National Domestic Violence Hotline: 1-800-799-7233",
-            "SAMHSA's National Helpline: 1-800-662-HELP"
-        ]
-    }
-    
-    # Combine resources based on crisis type
-    if crisis_type and any(t in crisis_type for t in specialized_resources.keys()):
-        relevant_resources = []
-        for t in specialized_resources.keys():
-            if t in crisis_type:
-                relevant_resources.extend(specialized_resources[t])
-        
-        # Add general resources
-        relevant_resources.extend([r for r in general_resources if r not in relevant_resources])
-        return "\n".join(relevant_resources)
-    
-    # Return general resources if no specific type or type not in our resource list
-    return "\n".join(general_resources)
-
 @app.route('/test_crisis_detection', methods=['POST'])
 def test_crisis_detection():
     data = request.json
@@ -655,13 +1152,15 @@ def crisis_resources_endpoint():
         'crisis_type': crisis_type
     })
 
+@timed_stage("mood_analysis")
 def analyze_mood_with_gemini(user_message):
     """
     Use Gemini to analyze the user's mood based on their message
     Returns one of: 'Happy', 'Sad', 'Angry', 'Anxious', 'Calm', 'Neutral'
     """
     if gemini_model is None:
-        print("Gemini model not available for mood detection")
+        logger.debug("Gemini model not available for mood detection")
+        FALLBACKS.inc(kind="mood_unavailable")
         return None
     
     try:
@@ -691,13 +1190,14 @@ def analyze_mood_with_gemini(user_message):
         valid_moods = ['Happy', 'Sad', 'Angry', 'Anxious', 'Calm', 'Neutral']
         for valid_mood in valid_moods:
             if valid_mood.lower() in mood.lower():
-                print(f"Gemini detected mood: {valid_mood}")
+                logger.debug("Gemini detected mood: %s", valid_mood, extra={"sample_rate": 0.1})
                 return valid_mood
         
-        print(f"Gemini returned unrecognized mood: {mood}, defaulting to Neutral")
+        logger.warning("Gemini returned unrecognized mood: %s, defaulting to Neutral", mood)
         return 'Neutral'
     except Exception as e:
-        print(f"Error in Gemini mood analysis: {e}")
+        logger.error("Error in Gemini mood analysis: %s", e)
+        FALLBACKS.inc(kind="mood_error")
         return None
 
 if __name__ == '__main__':
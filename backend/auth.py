@@ -0,0 +1,117 @@
+import hmac
+import os
+import secrets
+import threading
+import time
+import uuid
+
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+
+import database
+from database import hash_password
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Lifetime of issued tokens in seconds
+TOKEN_TTL = int(os.environ.get("TOKEN_TTL", "86400"))
+
+_secret_key = os.environ.get("SECRET_KEY")
+if not _secret_key:
+    logger.warning("SECRET_KEY is not set; using a random key, so tokens will not survive a restart")
+    _secret_key = secrets.token_hex(32)
+
+_serializer = URLSafeTimedSerializer(_secret_key, salt="auth-token")
+
+
+class RevocationCache:
+    """
+    In-memory set of revoked token ids. Entries are kept only until the token would
+    have expired anyway, so the cache stays small.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._revoked = {}
+
+    def revoke(self, jti, expires_at):
+        with self._lock:
+            if len(self._revoked) >= self.max_entries:
+                self._prune(time.time())
+            self._revoked[jti] = expires_at
+
+    def is_revoked(self, jti):
+        with self._lock:
+            return jti in self._revoked
+
+    def _prune(self, now):
+        expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= now]
+        for jti in expired:
+            del self._revoked[jti]
+
+
+revocations = RevocationCache()
+
+
+def _verify_password(stored_hash, password):
+    return hmac.compare_digest(stored_hash, hash_password(password))
+
+
+def authenticate(email, password):
+    """
+    Check credentials against the stored hash (one DB lookup).
+    Returns the user dict without the password, or None.
+    """
+    user = database.get_user_by_email(email)
+    if user is None:
+        # Hash anyway so unknown emails take as long as wrong passwords
+        hash_password(password)
+        return None
+
+    if not _verify_password(user["password"], password):
+        return None
+    return {"id": user["id"], "email": user["email"], "name": user["name"]}
+
+
+def issue_token(user):
+    """
+    Signed, expiring token carrying only the user id and a token id. The payload is
+    readable by anyone holding the token, so it carries no profile data.
+    """
+    payload = {
+        "uid": user["id"],
+        "jti": uuid.uuid4().hex,
+    }
+    return _serializer.dumps(payload)
+
+
+def verify_token(token):
+    """Validate a token in memory. Returns its payload, or None if invalid, expired or revoked."""
+    try:
+        payload = _serializer.loads(token, max_age=TOKEN_TTL)
+    except BadSignature:
+        # Also covers SignatureExpired
+        return None
+
+    if revocations.is_revoked(payload.get("jti")):
+        return None
+    return payload
+
+
+def revoke_token(token):
+    """Revoke a valid token until its natural expiry. Returns False if it was not valid."""
+    try:
+        payload, issued_at = _serializer.loads(token, max_age=TOKEN_TTL, return_timestamp=True)
+    except BadSignature:
+        return False
+
+    revocations.revoke(payload["jti"], issued_at.timestamp() + TOKEN_TTL)
+    return True
+
+
+def token_from_header(authorization):
+    """Extract the token from an 'Authorization: Bearer <token>' header value"""
+    if authorization and authorization.startswith("Bearer "):
+        return authorization[len("Bearer "):].strip()
+    return None
@@ -0,0 +1,153 @@
+"""
+Serialization time and bytes on the wire for the largest payloads, before and after.
+
+Compares the stdlib encoder Flask used by default (sort_keys, compact separators) with
+orjson, both bare and through jsonify with Flask's default provider and OrjsonProvider,
+and raw bodies with gzip and brotli. Missing optional modules are reported as null.
+
+    cd backend
+    python bench/bench_serialization.py --output serialization.json
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from json_provider import OrjsonProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+WORDS = ("anxiety depression support therapy mental health symptoms treatment help "
+         "feelings sleep stress panic recovery care family friends doctor").split()
+
+
+def resources_payload():
+    """The /resources body: the scraped articles if present, else synthetic articles of similar size"""
+    resources = []
+    resources_dir = os.path.join(BACKEND_DIR, "resources")
+    for i in range(1, 6):
+        path = os.path.join(resources_dir, f"scraped_data_{i}.txt")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+        else:
+            rng = random.Random(i)
+            content = "\n\n".join(" ".join(rng.choice(WORDS) for _ in range(80)) for _ in range(60))
+        resources.append({"title": f"Mental Health Resource {i}", "content": content})
+    return {"resources": resources, "updated": False}
+
+
+def therapists_payload(count):
+    rng = random.Random(0)
+    specializations = ["Psychology", "Counseling", "Psychiatry", "CBT", "Family Therapy"]
+    return [{
+        "id": i,
+        "name": f"Dr. Therapist {i}",
+        "specialization": rng.choice(specializations),
+        "experience": rng.randint(1, 40),
+        "contact": f"therapist{i}@example.com"
+    } for i in range(1, count + 1)]
+
+
+def users_payload(count):
+    return {"success": True, "users": [{"id": i, "email": f"user{i}@example.com", "name": f"User {i}"}
+                                       for i in range(1, count + 1)]}
+
+
+def time_call(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def time_jsonify(provider_class, obj, repeat):
+    """Time a full jsonify response (serialization plus Response construction) with the given provider"""
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    with app.app_context():
+        return time_call(lambda: app.json.response(obj), repeat)
+
+
+def bench_payload(name, obj, repeat):
+    # Flask's default provider: sort_keys=True, compact separators outside debug mode
+    stdlib_body = json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    result = {
+        "payload": name,
+        "stdlib_json_ms": time_call(lambda: json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8"),
+                                    repeat),
+        "orjson_ms": None,
+        "jsonify_default_ms": time_jsonify(DefaultJSONProvider, obj, repeat),
+        "jsonify_orjson_ms": None,
+        "raw_bytes": len(stdlib_body),
+        "gzip_bytes": len(gzip.compress(stdlib_body, compresslevel=6, mtime=0)),
+        "gzip_ms": time_call(lambda: gzip.compress(stdlib_body, compresslevel=6, mtime=0), repeat),
+        "brotli_bytes": None,
+        "brotli_ms": None,
+    }
+    if orjson is not None:
+        result["orjson_ms"] = time_call(lambda: orjson.dumps(obj, option=orjson.OPT_SORT_KEYS), repeat)
+        result["jsonify_orjson_ms"] = time_jsonify(OrjsonProvider, obj, repeat)
+    if brotli is not None:
+        result["brotli_bytes"] = len(brotli.compress(stdlib_body, quality=6))
+        result["brotli_ms"] = time_call(lambda: brotli.compress(stdlib_body, quality=6), repeat)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialization and response compression")
+    parser.add_argument("--therapists", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    payloads = [
+        ("/resources", resources_payload()),
+        ("/therapists", therapists_payload(args.therapists)),
+        ("/list_users", users_payload(args.users)),
+    ]
+    report = {
+        "orjson_available": orjson is not None,
+        "brotli_available": brotli is not None,
+        "results": [bench_payload(name, obj, args.repeat) for name, obj in payloads],
+    }
+
+    for r in report["results"]:
+        orjson_ms = f"{r['orjson_ms']:.2f}" if r["orjson_ms"] is not None else "n/a"
+        jsonify_orjson_ms = f"{r['jsonify_orjson_ms']:.2f}" if r["jsonify_orjson_ms"] is not None else "n/a"
+        brotli_bytes = r["brotli_bytes"] if r["brotli_bytes"] is not None else "n/a"
+        print(f"{r['payload']}: json {r['stdlib_json_ms']:.2f} ms -> orjson {orjson_ms} ms; "
+              f"jsonify {r['jsonify_default_ms']:.2f} ms -> {jsonify_orjson_ms} ms; "
+              f"{r['raw_bytes']} B -> gzip {r['gzip_bytes']} B, br {brotli_bytes} B", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Local stand-in for the Gemini REST API with configurable latency.
+
+Serves the two calls app.py makes: listing models and generateContent.
+Point the backend at it with GEMINI_API_ENDPOINT=http://127.0.0.1:<port>.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODEL_NAME = "models/gemini-2.0-flash"
+MOODS = ['Happy', 'Sad', 'Angry', 'Anxious', 'Calm', 'Neutral']
+
+REFINED_REPLIES = [
+    "hey, I hear you. that sounds really tough. want to talk about what's been going on?",
+    "listen, it's okay to feel this way. you don't have to figure it all out today 💙",
+    "that's a lot to carry. I'm here - what's been the hardest part?",
+]
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    # Set by make_server
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    def _delay(self):
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if re.match(r"^/v1beta/models/?(\?.*)?$", self.path):
+            self._send_json(200, {"models": [{
+                "name": MODEL_NAME,
+                "displayName": "Fake Gemini",
+                "supportedGenerationMethods": ["generateContent"],
+            }]})
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+    def do_POST(self):
+        if ":generateContent" not in self.path:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request_body = json.loads(self.rfile.read(length) or b"{}")
+        prompt = " ".join(part.get("text", "")
+                          for content in request_body.get("contents", [])
+                          for part in content.get("parts", []))
+
+        self._delay()
+        if random.random() < self.error_rate:
+            self._send_json(503, {"error": {"code": 503, "message": "Fake overload"}})
+            return
+
+        if "Analyze the emotional state" in prompt:
+            text = random.choice(MOODS)
+        else:
+            text = random.choice(REFINED_REPLIES)
+
+        self._send_json(200, {
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {"promptTokenCount": len(prompt.split()), "candidatesTokenCount": len(text.split())},
+        })
+
+
+def make_server(host="127.0.0.1", port=0, latency_ms=0, jitter_ms=0, error_rate=0.0):
+    """Create the fake server; port=0 picks a free port (see server.server_address)"""
+    handler = type("ConfiguredFakeGeminiHandler", (FakeGeminiHandler,), {
+        "latency": latency_ms / 1000,
+        "jitter": jitter_ms / 1000,
+        "error_rate": error_rate,
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_in_thread(**kwargs):
+    server = make_server(**kwargs)
+    thread = threading.Thread(target=server.serve_forever, name="fake-gemini", daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Gemini API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"Fake Gemini listening on http://{args.host}:{server.server_address[1]}")
+    server.serve_forever()
@@ -0,0 +1,188 @@
+"""
+Replay a recorded request mix against the backend at fixed concurrency levels.
+
+The mix is JSONL, one request per line:
+    {"method": "POST", "path": "/chat", "body": {"message": "...", "emotion": "Sad"}}
+    {"method": "GET", "path": "/resources"}
+
+For each concurrency level the mix is replayed (cycled to --requests total) and the
+report lists p50/p95/p99 latency, throughput and status codes per endpoint, plus the
+server's RSS when --server-pid is given. The report is written as JSON.
+"""
+import argparse
+import itertools
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def load_mix(path):
+    mix = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line)
+            if "path" not in entry:
+                raise ValueError(f"{path}:{line_number}: request is missing 'path'")
+            entry.setdefault("method", "POST" if "body" in entry else "GET")
+            mix.append(entry)
+    if not mix:
+        raise ValueError(f"{path} contains no requests")
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def read_rss_bytes(pid):
+    """Resident set size of a process from /proc (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler:
+    """Polls a process's RSS in the background and keeps the peak"""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        if self.pid:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = read_rss_bytes(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            self._stop.wait(self.interval)
+
+
+def run_level(base_url, mix, concurrency, total_requests, timeout, server_pid=None):
+    local = threading.local()
+    results = []
+    results_lock = threading.Lock()
+
+    def send(entry):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = session.request(entry["method"], base_url + entry["path"],
+                                       json=entry.get("body"), timeout=timeout)
+            status = response.status_code
+            size = len(response.content)
+        except requests.RequestException:
+            status = "error"
+            size = 0
+        elapsed = time.perf_counter() - start
+        with results_lock:
+            results.append((entry["method"] + " " + entry["path"], status, elapsed, size))
+
+    requests_to_send = list(itertools.islice(itertools.cycle(mix), total_requests))
+    rss_before = read_rss_bytes(server_pid) if server_pid else None
+
+    with RssSampler(server_pid) as rss:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(send, requests_to_send))
+        wall_time = time.perf_counter() - start
+
+    endpoints = {}
+    for endpoint, status, elapsed, size in results:
+        stats = endpoints.setdefault(endpoint, {"latencies": [], "status_codes": {}, "bytes": 0})
+        stats["latencies"].append(elapsed)
+        stats["status_codes"][str(status)] = stats["status_codes"].get(str(status), 0) + 1
+        stats["bytes"] += size
+
+    report = {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "wall_time_seconds": wall_time,
+        "throughput_rps": len(results) / wall_time if wall_time else None,
+        "rss_bytes_before": rss_before,
+        "rss_bytes_peak": rss.peak,
+        "rss_bytes_after": read_rss_bytes(server_pid) if server_pid else None,
+        "endpoints": {},
+    }
+    for endpoint, stats in endpoints.items():
+        latencies = sorted(stats["latencies"])
+        report["endpoints"][endpoint] = {
+            "requests": len(latencies),
+            "throughput_rps": len(latencies) / wall_time if wall_time else None,
+            "p50_ms": 1000 * percentile(latencies, 0.50),
+            "p95_ms": 1000 * percentile(latencies, 0.95),
+            "p99_ms": 1000 * percentile(latencies, 0.99),
+            "max_ms": 1000 * latencies[-1],
+            "mean_response_bytes": stats["bytes"] / len(latencies),
+            "status_codes": stats["status_codes"],
+        }
+    return report
+
+
+def run(base_url, mix_path, concurrency_levels, total_requests, timeout=60, server_pid=None, warmup=5):
+    mix = load_mix(mix_path)
+
+    # Warm up caches and lazy initialization before measuring
+    if warmup:
+        run_level(base_url, mix, 1, warmup, timeout)
+
+    levels = []
+    for concurrency in concurrency_levels:
+        print(f"Running {total_requests} requests at concurrency {concurrency}...", file=sys.stderr)
+        levels.append(run_level(base_url, mix, concurrency, total_requests, timeout, server_pid))
+
+    return {
+        "base_url": base_url,
+        "mix": mix_path,
+        "timestamp": time.time(),
+        "levels": levels,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a request mix and report latency/throughput")
+    parser.add_argument("mix", help="JSONL file of requests to replay")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--server-pid", type=int, help="PID of the server process for RSS sampling")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = run(args.base_url, args.mix, [int(c) for c in args.concurrency.split(",")],
+                 args.requests, args.timeout, args.server_pid)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
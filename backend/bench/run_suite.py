@@ -0,0 +1,110 @@
+"""
+End-to-end benchmark: fake Gemini + tiny T5 + the real Flask app + the load generator.
+
+    cd backend
+    python bench/run_suite.py --output bench_results.json
+
+Starts the fake Gemini server, builds the tiny stand-in model if needed, launches
+app.py in a subprocess pointed at both and at a throwaway database, replays the
+request mix and writes the machine-readable report. No network access or model tar is needed once the
+t5-small tokenizer is in the local Hugging Face cache.
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import fake_gemini
+import loadgen
+from tiny_model import build_tiny_model, DEFAULT_OUTPUT_DIR
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_server(base_url, process, timeout=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with code {process.returncode} during startup")
+        try:
+            if requests.get(base_url + "/test_connection", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Backend did not become ready within {timeout} seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the end-to-end backend benchmark")
+    parser.add_argument("--mix", default=os.path.join(BENCH_DIR, "sample_requests.jsonl"))
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--gemini-latency-ms", type=float, default=300)
+    parser.add_argument("--gemini-jitter-ms", type=float, default=100)
+    parser.add_argument("--model-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--inference-backend", default="torch")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    build_tiny_model(args.model_dir)
+    gemini = fake_gemini.start_in_thread(latency_ms=args.gemini_latency_ms, jitter_ms=args.gemini_jitter_ms)
+    gemini_url = f"http://127.0.0.1:{gemini.server_address[1]}"
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    # The request mix writes history rows, so keep them out of the tracked sample.db
+    db_dir = tempfile.mkdtemp(prefix="bench-db-")
+    env = dict(os.environ,
+               DATABASE_PATH=os.path.join(db_dir, "bench.db"),
+               GEMINI_API_KEY="bench",
+               GEMINI_API_ENDPOINT=gemini_url,
+               MODEL_DIR=args.model_dir,
+               INFERENCE_BACKEND=args.inference_backend,
+               # The load generator is a single client; don't let per-client rate limits skew results
+               CHAT_CLIENT_RATE="100000",
+               CHAT_CLIENT_BURST="100000")
+    server_code = f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True, use_reloader=False)"
+    server = subprocess.Popen([sys.executable, "-c", server_code], cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_server(base_url, server)
+        report = loadgen.run(base_url, args.mix, [int(c) for c in args.concurrency.split(",")],
+                             args.requests, server_pid=server.pid)
+        report["config"] = {
+            "gemini_latency_ms": args.gemini_latency_ms,
+            "gemini_jitter_ms": args.gemini_jitter_ms,
+            "model_dir": args.model_dir,
+            "inference_backend": args.inference_backend,
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        gemini.shutdown()
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
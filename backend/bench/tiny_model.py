@@ -0,0 +1,52 @@
+"""
+Build a tiny random-weight T5 stand-in for the 200 MB+ taz model.
+
+The tokenizer is copied from a real T5 checkpoint (default t5-small) so prompts
+tokenize the same way; only the network is shrunk. Load it in the backend with
+MODEL_DIR=<output dir>.
+"""
+import argparse
+import os
+import torch
+from transformers import T5Config, T5ForConditionalGeneration, T5Tokenizer
+
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "tiny_t5")
+
+
+def build_tiny_model(output_dir=DEFAULT_OUTPUT_DIR, tokenizer_source="t5-small", seed=0,
+                     d_model=64, num_layers=2, num_heads=2):
+    if os.path.exists(os.path.join(output_dir, "config.json")):
+        print(f"Tiny model already exists at {output_dir}")
+        return output_dir
+
+    torch.manual_seed(seed)
+    tokenizer = T5Tokenizer.from_pretrained(tokenizer_source, legacy=False)
+    config = T5Config(
+        vocab_size=len(tokenizer),
+        d_model=d_model,
+        d_kv=d_model // num_heads,
+        d_ff=d_model * 2,
+        num_layers=num_layers,
+        num_decoder_layers=num_layers,
+        num_heads=num_heads,
+        decoder_start_token_id=tokenizer.pad_token_id,
+        pad_token_id=tokenizer.pad_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+    )
+    model = T5ForConditionalGeneration(config)
+    model.eval()
+
+    os.makedirs(output_dir, exist_ok=True)
+    model.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    print(f"Saved tiny T5 ({sum(p.numel() for p in model.parameters())} parameters) to {output_dir}")
+    return output_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create a tiny random-weight T5 model")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--tokenizer", default="t5-small", help="Tokenizer to copy")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    build_tiny_model(args.output, args.tokenizer, args.seed)
@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import sys
+import torch
+from transformers import T5Tokenizer, T5ForConditionalGeneration
+from inference import TorchBackend, OnnxBackend, GENERATION_KWARGS, build_model_prompt, measure_token_latency
+
+# Fixed prompts used for both the parity check and the latency benchmark
+TEST_MESSAGES = [
+    "I'm feeling anxious today",
+    "I can't sleep and my thoughts keep racing",
+    "How do I talk to my family about my depression?",
+]
+
+# Decoding configs checked for parity: plain greedy decoding, and the app's production
+# settings (beam search with sampling), which match only when both engines are seeded alike
+PARITY_CONFIGS = {
+    "greedy": {
+        "max_length": 64,
+        "do_sample": False,
+        "num_beams": 1,
+    },
+    "production": GENERATION_KWARGS,
+}
+
+
+def default_model_source():
+    """Use the extracted taz model if available, otherwise the public t5-small"""
+    extracted = os.path.join(os.path.dirname(__file__), "models", "extracted_model", "taz_model")
+    if os.path.exists(os.path.join(extracted, "config.json")):
+        return extracted
+    return "t5-small"
+
+
+def check_parity(torch_backend, onnx_backend, tokenizer, seed, config_name):
+    """Compare decoded outputs of both backends on the fixed prompts, reseeding before each call"""
+    generation_kwargs = PARITY_CONFIGS[config_name]
+    mismatches = []
+    for message in TEST_MESSAGES:
+        inputs = tokenizer(build_model_prompt(message, "Neutral"), return_tensors="pt")
+
+        torch.manual_seed(seed)
+        torch_output = torch_backend.generate(inputs.input_ids, attention_mask=inputs.attention_mask,
+                                              **generation_kwargs)
+        torch.manual_seed(seed)
+        onnx_output = onnx_backend.generate(inputs.input_ids, attention_mask=inputs.attention_mask,
+                                            **generation_kwargs)
+
+        torch_text = tokenizer.decode(torch_output[0], skip_special_tokens=True)
+        onnx_text = tokenizer.decode(onnx_output[0], skip_special_tokens=True)
+        if torch_text != onnx_text:
+            mismatches.append({"config": config_name, "message": message, "torch": torch_text, "onnx": onnx_text})
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check torch/ONNX parity and compare per-token latency")
+    parser.add_argument("--model", default=default_model_source(), help="Model directory or hub id")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--runs", type=int, default=5, help="Timed generate calls per backend")
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    print(f"Loading model from {args.model}")
+    tokenizer = T5Tokenizer.from_pretrained(args.model, legacy=False)
+    model = T5ForConditionalGeneration.from_pretrained(args.model)
+    model.eval()
+
+    torch_backend = TorchBackend(model, tokenizer, torch.device("cpu"))
+    onnx_backend = OnnxBackend.from_model_dir(args.model, tokenizer)
+
+    mismatches = []
+    for config_name in PARITY_CONFIGS:
+        config_mismatches = check_parity(torch_backend, onnx_backend, tokenizer, args.seed, config_name)
+        print(f"Parity check ({config_name}, seed {args.seed}): "
+              f"{len(TEST_MESSAGES) - len(config_mismatches)}/{len(TEST_MESSAGES)} outputs match")
+        for mismatch in config_mismatches:
+            print(f"  Mismatch for {mismatch['message']!r}:\n    torch: {mismatch['torch']}\n    onnx:  {mismatch['onnx']}")
+        mismatches.extend(config_mismatches)
+
+    # Benchmark with the longest prompt so the decoder cache matters
+    inputs = tokenizer(build_model_prompt(TEST_MESSAGES[-1], "Neutral"), return_tensors="pt")
+    results = {"model": args.model, "seed": args.seed, "parity_mismatches": mismatches, "latency": []}
+    for config_name, generation_kwargs in PARITY_CONFIGS.items():
+        for backend in (torch_backend, onnx_backend):
+            torch.manual_seed(args.seed)
+            stats = measure_token_latency(backend, inputs.input_ids, attention_mask=inputs.attention_mask,
+                                          runs=args.runs, **generation_kwargs)
+            stats["config"] = config_name
+            results["latency"].append(stats)
+            print(f"{stats['backend']} ({config_name}): {stats['mean_ms_per_token']:.2f} ms/token "
+                  f"(median {stats['median_ms_per_token']:.2f}, min {stats['min_ms_per_token']:.2f})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
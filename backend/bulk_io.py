@@ -0,0 +1,190 @@
+import argparse
+import csv
+import json
+import sys
+
+import database
+from database import hash_password
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Columns accepted on import and written on export for each table.
+# Password hashes are never exported.
+TABLES = {
+    "therapists": {
+        "import_columns": ["name", "specialization", "experience", "contact"],
+        "export_columns": ["id", "name", "specialization", "experience", "contact"],
+    },
+    "users": {
+        "import_columns": ["email", "password", "name"],
+        "export_columns": ["id", "email", "name"],
+    },
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def iter_records(stream, fmt):
+    """Yield dicts from a text stream of CSV (with a header row) or JSONL"""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    elif fmt == "jsonl":
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _to_row(table, record):
+    """Convert an input record to an insert tuple, or None if it is not an object or is missing required fields"""
+    if not isinstance(record, dict):
+        return None
+    if table == "users":
+        # Accept plaintext passwords (hashed here) or already-hashed ones
+        password_hash = record.get("password_hash") or (
+            hash_password(record["password"]) if record.get("password") else None)
+        if not record.get("email") or not record.get("name") or not password_hash:
+            return None
+        return (record["email"], password_hash, record["name"])
+
+    values = [record.get(column) for column in TABLES[table]["import_columns"]]
+    if any(value in (None, "") for value in values):
+        return None
+    try:
+        values[2] = int(values[2])  # experience
+    except (TypeError, ValueError):
+        return None
+    return tuple(values)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_records(table, records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream records into the table with executemany, committing once per chunk so the
+    history writer and other writers only ever wait for one chunk, not the whole upload.
+    If a chunk fails, the chunks before it stay committed.
+    There is no index drop and rebuild: therapists has no secondary index, and the only one
+    on users backs the email UNIQUE constraint, which INSERT OR IGNORE needs during the load.
+    Returns {"inserted": n, "skipped": n}.
+    """
+    if table not in TABLES:
+        raise ValueError(f"Unknown table: {table}")
+
+    columns = TABLES[table]["import_columns"]
+    # Duplicate emails are skipped rather than aborting the whole import
+    verb = "INSERT OR IGNORE" if table == "users" else "INSERT"
+    sql = f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    database.init_db()
+    conn = database.create_connection()
+    if conn is None:
+        raise RuntimeError("Database connection failed")
+
+    skipped = 0
+    inserted = 0
+
+    def valid_rows():
+        nonlocal skipped
+        for record in records:
+            row = _to_row(table, record)
+            if row is None:
+                skipped += 1
+            else:
+                yield row
+
+    try:
+        for chunk in _chunks(valid_rows(), chunk_size):
+            with conn:
+                before = conn.total_changes
+                conn.executemany(sql, chunk)
+                changed = conn.total_changes - before
+            inserted += changed
+            skipped += len(chunk) - changed
+    finally:
+        conn.close()
+
+    logger.info("Imported %s rows into %s (%s skipped)", inserted, table, skipped)
+    return {"inserted": inserted, "skipped": skipped}
+
+
+def iter_export_rows(table, batch_size=1000):
+    """
+    Yield rows as dicts straight from the cursor in batches; the table is never
+    held in memory as a whole.
+    """
+    if table not in TABLES:
+        raise ValueError(f"Unknown table: {table}")
+
+    columns = TABLES[table]["export_columns"]
+    conn = database.create_connection()
+    if conn is None:
+        raise RuntimeError("Database connection failed")
+    try:
+        cur = conn.cursor()
+        cur.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(columns, row))
+    finally:
+        conn.close()
+
+
+def export_jsonl(table):
+    """Yield the table as JSONL lines"""
+    for row in iter_export_rows(table):
+        yield json.dumps(row) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export of therapists and users")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Load CSV or JSONL records into a table")
+    import_parser.add_argument("table", choices=sorted(TABLES))
+    import_parser.add_argument("input", help="Input file ('-' for stdin)")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"], help="Default: by file extension")
+    import_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    export_parser = subparsers.add_parser("export", help="Dump a table as JSONL")
+    export_parser.add_argument("table", choices=sorted(TABLES))
+    export_parser.add_argument("output", nargs="?", default="-", help="Output file ('-' for stdout)")
+
+    args = parser.parse_args()
+
+    if args.command == "import":
+        fmt = args.format or ("csv" if args.input.endswith(".csv") else "jsonl")
+        stream = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8", newline="")
+        try:
+            result = import_records(args.table, iter_records(stream, fmt), args.chunk_size)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        print(json.dumps(result))
+    else:
+        out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        try:
+            for line in export_jsonl(args.table):
+                out.write(line)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+# Importing app loads the model and configures Gemini, exactly as the server does
+from app import score_messages, iter_jsonl, BULK_GEMINI_CONCURRENCY
+
+
+def count_completed(output_path):
+    """
+    Number of complete result lines already in the output file.
+    A trailing partial line from an interrupted run is truncated away.
+    """
+    if not os.path.exists(output_path):
+        return 0
+
+    completed = 0
+    valid_bytes = 0
+    with open(output_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            completed += 1
+            valid_bytes += len(line)
+
+    if valid_bytes != os.path.getsize(output_path):
+        with open(output_path, "r+b") as f:
+            f.truncate(valid_bytes)
+    return completed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Score a JSONL file of messages with crisis detection, mood analysis and the T5 model"
+    )
+    parser.add_argument("input", help="JSONL input, one {\"message\": ..., \"emotion\": ..., \"id\": ...} per line ('-' for stdin)")
+    parser.add_argument("output", help="JSONL output; doubles as the checkpoint for --resume")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--gemini-concurrency", type=int, default=BULK_GEMINI_CONCURRENCY,
+                        help="Gemini worker threads; calls are also capped by BULK_GEMINI_CONCURRENCY")
+    parser.add_argument("--refine", action="store_true", help="Also refine each response with Gemini")
+    parser.add_argument("--resume", action="store_true", help="Skip inputs already present in the output file")
+    args = parser.parse_args()
+
+    skip = count_completed(args.output) if args.resume else 0
+    if skip:
+        print(f"Resuming after {skip} completed records", file=sys.stderr)
+
+    input_file = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    start = time.perf_counter()
+    processed = 0
+    try:
+        records = itertools.islice(iter_jsonl(input_file), skip, None)
+        with open(args.output, "a" if args.resume else "w", encoding="utf-8") as out:
+            for result in score_messages(records, batch_size=args.batch_size,
+                                         gemini_concurrency=args.gemini_concurrency, refine=args.refine):
+                out.write(json.dumps(result) + "\n")
+                processed += 1
+                # Flush once per batch so a crash loses at most one batch
+                if processed % args.batch_size == 0:
+                    out.flush()
+                    elapsed = time.perf_counter() - start
+                    print(f"{skip + processed} records scored ({processed / elapsed:.1f}/s)", file=sys.stderr)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Done: {processed} records in {elapsed:.1f}s ({skip + processed} total in {args.output})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
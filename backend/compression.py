@@ -0,0 +1,120 @@
+import gzip
+import os
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from metrics import REGISTRY, Counter
+
+COMPRESSED_BYTES = REGISTRY.register(Counter(
+    "mental_health_response_bytes_total",
+    "Response body bytes before and after compression",
+    labelnames=("encoding", "stage")
+))
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/", "application/javascript")
+
+# Streams that clients consume line by line are left uncompressed so results arrive promptly
+UNBUFFERED_MIMETYPES = ("application/x-ndjson",)
+
+
+def parse_accept_encoding(header):
+    """Map of accepted encodings to their q-values"""
+    accepted = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+def choose_encoding(header):
+    """Pick brotli over gzip when the client accepts it and the module is installed"""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0
+    for encoding in candidates:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress_bytes(data, encoding, level):
+    if encoding == "br":
+        # Brotli quality runs 0-11; map the gzip-style level onto it
+        return brotli.compress(data, quality=min(11, level))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _gzip_stream(chunks, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def init_compression(app, min_size=None, level=None):
+    """
+    Compress responses with br or gzip, negotiated from Accept-Encoding.
+    Bodies smaller than min_size bytes are sent as-is, since compressing them costs more than it saves.
+    Streamed responses are gzip-compressed on the fly.
+    """
+    min_size = int(min_size if min_size is not None else os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+    level = int(level if level is not None else os.environ.get("COMPRESSION_LEVEL", "6"))
+
+    @app.after_request
+    def compress_response(response):
+        mimetype = response.mimetype or ""
+        if (response.status_code < 200 or response.status_code in (204, 304)
+                or "Content-Encoding" in response.headers
+                or not mimetype.startswith(COMPRESSIBLE_MIMETYPES)
+                or mimetype in UNBUFFERED_MIMETYPES):
+            return response
+
+        accept_encoding = request.headers.get("Accept-Encoding")
+        response.vary.add("Accept-Encoding")
+
+        if response.is_streamed:
+            # Streams are compressed incrementally, which only the gzip path supports
+            accepted = parse_accept_encoding(accept_encoding)
+            if accepted.get("gzip", accepted.get("*", 0)) <= 0:
+                return response
+            response.response = _gzip_stream(response.response, level)
+            response.headers["Content-Encoding"] = "gzip"
+            response.headers.pop("Content-Length", None)
+            return response
+
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None or response.direct_passthrough:
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        compressed = compress_bytes(data, encoding, level)
+        COMPRESSED_BYTES.inc(len(data), encoding=encoding, stage="raw")
+        COMPRESSED_BYTES.inc(len(compressed), encoding=encoding, stage="sent")
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,100 @@
+import re
+from metrics import timed_stage
+
+# Crisis indicators (expand this list)
+CRISIS_KEYWORDS = {
+    'suicide': ['kill myself', 'suicide', 'end my life', 'want to die', 'better off dead'],
+    'self_harm': ['cut myself', 'hurt myself', 'self harm', 'harming myself', 'burn myself'],
+    'violence': ['hurt someone', 'kill someone', 'attack', 'harm others'],
+    'immediate_danger': ['right now', 'tonight', 'plan to', 'going to']
+}
+
+# Category whose terms raise the confidence of any other match
+IMMEDIATE_DANGER = 'immediate_danger'
+
+
+class CrisisMatcher:
+    """
+    Keyword matcher compiled from a keyword set: one regex alternation per category,
+    matching substrings of the lowercased message like a plain `keyword in message` check.
+    """
+
+    def __init__(self, crisis_keywords=CRISIS_KEYWORDS):
+        self.crisis_keywords = crisis_keywords
+        self.patterns = [
+            (category, re.compile("|".join(re.escape(keyword.lower()) for keyword in keywords)))
+            for category, keywords in crisis_keywords.items() if keywords
+        ]
+        # One combined pattern rejects the common no-crisis case in a single search
+        all_keywords = [keyword.lower() for keywords in crisis_keywords.values() for keyword in keywords]
+        self.any_pattern = re.compile("|".join(re.escape(keyword) for keyword in all_keywords)) if all_keywords else None
+        danger_keywords = crisis_keywords.get(IMMEDIATE_DANGER, [])
+        self.danger_pattern = (re.compile("|".join(re.escape(k.lower()) for k in danger_keywords))
+                               if danger_keywords else None)
+
+    def categories(self, message):
+        """Categories with at least one keyword in the (already lowercased) message, in keyword-set order"""
+        if self.any_pattern is None or not self.any_pattern.search(message):
+            return []
+        return [category for category, pattern in self.patterns if pattern.search(message)]
+
+    def detect(self, message):
+        message = message.lower()
+        detected_categories = self.categories(message)
+        if not detected_categories:
+            return (False, None, 0)
+        
+        # Higher score for immediate danger terms
+        score = 0.9 if self.danger_pattern is not None and self.danger_pattern.search(message) else 0.7
+        return (True, ', '.join(detected_categories), score)
+
+
+default_matcher = CrisisMatcher()
+
+
+@timed_stage("crisis_detection")
+def detect_crisis(message):
+    """
+    Detects potential crisis indicators in user messages
+    Returns a tuple of (is_crisis, crisis_type, confidence_score)
+    """
+    return default_matcher.detect(message)
+
+def get_crisis_resources(crisis_type=None):
+    """Returns crisis resources based on detected type"""
+    # Default crisis resources
+    general_resources = [
+        "National Suicide Prevention Lifeline: 1-800-273-8255 (24/7)",
+        "Crisis Text Line: Text HOME to 741741 (24/7)",
+        "SAMHSA's National Helpline: 1-800-662-HELP (4357)"
+    ]
+    
+    # Specialized resources based on crisis type
+    specialized_resources = {
+        "suicide": [
+            "National Suicide Prevention Lifeline: 1-800-273-8255",
+            "IMAlive Crisis Chat: www.imalive.org"
+        ],
+        "self_harm": [
+            "S.A.F.E. Alternatives: 1-800-DONT-CUT",
+            "Self-Harm Crisis Text Line: Text HOME to 741741"
+        ],
+        "violence": [
+            "National Domestic Violence Hotline: 1-800-799-7233",
+            "SAMHSA's National Helpline: 1-800-662-HELP"
+        ]
+    }
+    
+    # Combine resources based on crisis type
+    if crisis_type and any(t in crisis_type for t in specialized_resources.keys()):
+        relevant_resources = []
+        for t in specialized_resources.keys():
+            if t in crisis_type:
+                relevant_resources.extend(specialized_resources[t])
+        
+        # Add general resources
+        relevant_resources.extend([r for r in general_resources if r not in relevant_resources])
+        return "\n".join(relevant_resources)
+    
+    # Return general resources if no specific type or type not in our resource list
+    return "\n".join(general_resources)
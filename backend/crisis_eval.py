@@ -0,0 +1,233 @@
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from crisis import CRISIS_KEYWORDS, CrisisMatcher
+
+# Set in each worker process by _init_worker
+_matchers = None
+
+
+def load_keywords(path):
+    """Keyword set JSON: {"category": ["keyword", ...], ...}; None means the deployed set"""
+    if path is None:
+        return CRISIS_KEYWORDS
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def shard_ranges(path, shards):
+    """Split the file into byte ranges that start and end on line boundaries"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    step = max(1, size // shards)
+    ranges = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = min(size, start + step)
+            if end < size:
+                newline = mm.find(b"\n", end)
+                end = size if newline == -1 else newline + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_line(line, tsv):
+    """
+    Returns (lowercased text, set of labels) for one corpus line.
+    JSONL: {"text": ..., "labels": [...]}; TSV: "label1,label2<TAB>text" (empty labels = no crisis).
+    Raises ValueError for lines that are not a record of this shape.
+    """
+    if tsv:
+        labels, _, text = line.partition(b"\t")
+        labels = {label for label in labels.decode("utf-8").split(",") if label}
+        return text.decode("utf-8", errors="replace").lower(), labels
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError("record is not a JSON object")
+    text = record.get("text", record.get("message", ""))
+    if not isinstance(text, str):
+        raise ValueError("text is not a string")
+    labels = record.get("labels", [])
+    if isinstance(labels, str):
+        labels = [labels] if labels else []
+    if not isinstance(labels, list) or not all(isinstance(label, str) for label in labels):
+        raise ValueError("labels is not a list of strings")
+    return text.lower(), set(labels)
+
+
+def _init_worker(keyword_sets):
+    global _matchers
+    _matchers = [CrisisMatcher(keywords) for keywords in keyword_sets]
+
+
+def _new_counts(categories):
+    return {category: {"tp": 0, "fp": 0, "fn": 0} for category in categories}
+
+
+def _evaluate_shard(args):
+    path, start, end, tsv, max_examples = args
+    categories = sorted(set().union(*(m.crisis_keywords.keys() for m in _matchers)))
+    counts = [_new_counts(categories + ["any"]) for _ in _matchers]
+    changed = 0
+    examples = []
+    messages = 0
+    errors = 0
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        mm.seek(start)
+        while mm.tell() < end:
+            line = mm.readline().rstrip(b"\r\n")
+            if not line:
+                continue
+            try:
+                text, labels = parse_line(line, tsv)
+            except (ValueError, UnicodeDecodeError):
+                errors += 1
+                continue
+            messages += 1
+
+            predictions = []
+            for matcher, matcher_counts in zip(_matchers, counts):
+                predicted = set(matcher.categories(text))
+                predictions.append(predicted)
+                for category in predicted | labels:
+                    stats = matcher_counts.setdefault(category, {"tp": 0, "fp": 0, "fn": 0})
+                    if category in predicted and category in labels:
+                        stats["tp"] += 1
+                    elif category in predicted:
+                        stats["fp"] += 1
+                    else:
+                        stats["fn"] += 1
+                # Binary crisis / no-crisis
+                any_stats = matcher_counts["any"]
+                if predicted and labels:
+                    any_stats["tp"] += 1
+                elif predicted:
+                    any_stats["fp"] += 1
+                elif labels:
+                    any_stats["fn"] += 1
+
+            if len(predictions) == 2 and predictions[0] != predictions[1]:
+                changed += 1
+                if len(examples) < max_examples:
+                    examples.append({
+                        "text": text,
+                        "labels": sorted(labels),
+                        "baseline": sorted(predictions[0]),
+                        "candidate": sorted(predictions[1]),
+                    })
+
+    return {"messages": messages, "errors": errors, "counts": counts, "changed": changed, "examples": examples}
+
+
+def _merge_counts(target, source):
+    for category, stats in source.items():
+        merged = target.setdefault(category, {"tp": 0, "fp": 0, "fn": 0})
+        for key in ("tp", "fp", "fn"):
+            merged[key] += stats[key]
+
+
+def _metrics(counts):
+    report = {}
+    for category, stats in sorted(counts.items()):
+        tp, fp, fn = stats["tp"], stats["fp"], stats["fn"]
+        precision = tp / (tp + fp) if tp + fp else None
+        recall = tp / (tp + fn) if tp + fn else None
+        f1 = (2 * precision * recall / (precision + recall)
+              if precision is not None and recall is not None and precision + recall else None)
+        report[category] = dict(stats, precision=precision, recall=recall, f1=f1)
+    return report
+
+
+def evaluate(path, keyword_sets, workers=None, tsv=None, max_examples=20):
+    """
+    Evaluate one keyword set (or compare two) over a labeled corpus using a process pool.
+    Returns the report dict.
+    """
+    if tsv is None:
+        tsv = path.endswith((".tsv", ".txt"))
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    # Several shards per worker keeps the pool busy when lines vary in length
+    ranges = shard_ranges(path, workers * 4)
+    tasks = [(path, shard_start, shard_end, tsv, max_examples) for shard_start, shard_end in ranges]
+
+    with Pool(processes=workers, initializer=_init_worker, initargs=(keyword_sets,)) as pool:
+        shard_results = pool.map(_evaluate_shard, tasks)
+    elapsed = time.perf_counter() - start
+
+    totals = [dict() for _ in keyword_sets]
+    messages = sum(r["messages"] for r in shard_results)
+    for result in shard_results:
+        for total, counts in zip(totals, result["counts"]):
+            _merge_counts(total, counts)
+
+    report = {
+        "corpus": path,
+        "messages": messages,
+        "parse_errors": sum(r["errors"] for r in shard_results),
+        "workers": workers,
+        "seconds": elapsed,
+        "messages_per_second": messages / elapsed if elapsed else None,
+        "baseline": _metrics(totals[0]),
+    }
+
+    if len(keyword_sets) == 2:
+        candidate = _metrics(totals[1])
+        report["candidate"] = candidate
+        report["diff"] = {
+            "changed_predictions": sum(r["changed"] for r in shard_results),
+            "per_category": {
+                category: {
+                    key: (candidate[category][key] - report["baseline"][category][key]
+                          if candidate.get(category, {}).get(key) is not None
+                          and report["baseline"].get(category, {}).get(key) is not None else None)
+                    for key in ("tp", "fp", "fn", "precision", "recall", "f1")
+                }
+                for category in sorted(set(candidate) | set(report["baseline"]))
+            },
+            "examples": [example for r in shard_results for example in r["examples"]][:max_examples],
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate crisis keyword sets against a labeled corpus")
+    parser.add_argument("corpus", help="Labeled corpus: JSONL ({\"text\", \"labels\"}) or TSV (labels<TAB>text)")
+    parser.add_argument("--keywords", help="Keyword set JSON to evaluate (default: the deployed set)")
+    parser.add_argument("--compare", help="Second keyword set JSON to diff against --keywords")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--format", choices=["jsonl", "tsv"], help="Corpus format (default: by extension)")
+    parser.add_argument("--examples", type=int, default=20, help="Changed-prediction examples to include")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    keyword_sets = [load_keywords(args.keywords)]
+    if args.compare:
+        keyword_sets.append(load_keywords(args.compare))
+
+    tsv = None if args.format is None else args.format == "tsv"
+    report = evaluate(args.corpus, keyword_sets, args.workers, tsv, args.examples)
+
+    print(f"{report['messages']} messages in {report['seconds']:.2f}s "
+          f"({report['messages_per_second']:.0f}/s on {report['workers']} workers)", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
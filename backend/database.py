@@ -1,31 +1,41 @@
 import sqlite3
+import logging
 from sqlite3 import Error
 import hashlib
 import os
+from metrics import timed_stage
+from structured_logging import get_logger
 
+logger = get_logger(__name__)
+
+# DATABASE_PATH points the app at another database file (e.g. a throwaway one for benchmarks)
+DATABASE_PATH = os.environ.get("DATABASE_PATH")
+
+@timed_stage("db_connect")
 def create_connection():
-    """Create a database connection to the database in the root folder"""
-    # Use the database in the root directory instead of backend
-    root_dir = os.path.dirname(os.path.dirname(__file__))  # Go up one level to the project root
-    db_path = os.path.join(root_dir, 'sample.db')
-    
-    # Debug prints
-    print(f"Current file location: {__file__}")
-    print(f"Root directory: {root_dir}")
-    print(f"Attempting to connect to DB at: {db_path}")
-    print(f"DB file exists: {os.path.exists(db_path)}")
+    """Create a database connection to the database in the root folder, or DATABASE_PATH if set"""
+    if DATABASE_PATH:
+        db_path = DATABASE_PATH
+    else:
+        # Use the database in the root directory instead of backend
+        root_dir = os.path.dirname(os.path.dirname(__file__))  # Go up one level to the project root
+        db_path = os.path.join(root_dir, 'sample.db')
     
     conn = None
     try:
         conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        # Verify we can query the database
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
-        print(f"All Available tables in database: {tables}")
+        # Diagnostics cost an extra query, so only run them when debug logging is on
+        if logger.isEnabledFor(logging.DEBUG):
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            logger.debug("Connected to DB", extra={"fields": {
+                "db_path": db_path,
+                "db_exists": os.path.exists(db_path),
+                "tables": [row[0] for row in cursor.fetchall()]
+            }, "sample_rate": 0.01})
         return conn
     except Error as e:
-        print(f"Error connecting to database: {e}")
+        logger.error("Error connecting to database at %s: %s", db_path, e)
         return None
 
 def init_db():
@@ -49,9 +59,9 @@ def init_db():
                 
                 cursor.execute(users_table)
                 conn.commit()
-                print("Created users table")
+                logger.info("Created users table")
             else:
-                print("Users table already exists")
+                logger.debug("Users table already exists")
                 
             # Create therapists table
             therapists_table = """ CREATE TABLE IF NOT EXISTS therapists (
@@ -64,17 +74,55 @@ def init_db():
             
             cursor.execute(therapists_table)
             conn.commit()
-            print("Created therapists table")
+            logger.debug("Ensured therapists table exists")
+            
+            # Create conversation history table, indexed for per-user keyset pagination
+            history_table = """ CREATE TABLE IF NOT EXISTS conversation_history (
+                                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                user_id TEXT NOT NULL,
+                                created_at REAL NOT NULL,
+                                message TEXT NOT NULL,
+                                response TEXT,
+                                detected_mood TEXT,
+                                crisis_detected INTEGER NOT NULL DEFAULT 0,
+                                crisis_type TEXT,
+                                crisis_score REAL
+                            ); """
+            
+            cursor.execute(history_table)
+            cursor.execute("""CREATE INDEX IF NOT EXISTS idx_history_user_time
+                              ON conversation_history (user_id, created_at, id)""")
+            conn.commit()
+            logger.debug("Ensured conversation_history table exists")
+            
+            # Per-user mood counts per day/week, maintained incrementally by the history writer
+            mood_rollups_table = """ CREATE TABLE IF NOT EXISTS mood_rollups (
+                                user_id TEXT NOT NULL,
+                                period TEXT NOT NULL,
+                                period_start TEXT NOT NULL,
+                                mood TEXT NOT NULL,
+                                count INTEGER NOT NULL,
+                                PRIMARY KEY (user_id, period, period_start, mood)
+                            ) WITHOUT ROWID; """
+            
+            cursor.execute(mood_rollups_table)
+            conn.commit()
+            logger.debug("Ensured mood_rollups table exists")
             
             conn.close()
             return True
         except Error as e:
-            print(f"Error initializing database: {e}")
+            logger.error("Error initializing database: %s", e)
             return False
     else:
-        print("Error: Could not establish database connection")
+        logger.error("Could not establish database connection")
         return False
 
+def hash_password(password):
+    """Hash a password the way it is stored in the users table"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+@timed_stage("db_query")
 def create_user(email, password, name, mood=None):
     """Create a new user in the database"""
     # First ensure the database and table exist
@@ -84,7 +132,7 @@ def create_user(email, password, name, mood=None):
     if conn is not None:
         try:
             # Hash the password
-            hashed_password = hashlib.sha256(password.encode()).hexdigest()
+            hashed_password = hash_password(password)
             
             # Insert user data
             sql = ''' INSERT INTO users(email, password, name)
@@ -93,20 +141,21 @@ def create_user(email, password, name, mood=None):
             cur.execute(sql, (email, hashed_password, name))
             conn.commit()
             user_id = cur.lastrowid
-            print(f"Created new user with ID: {user_id}, name: {name}, email: {email}")
+            logger.info("Created new user", extra={"fields": {"user_id": user_id, "email": email}})
             conn.close()
             return {"success": True, "user_id": user_id}
         except sqlite3.IntegrityError as e:
-            print(f"Database integrity error: {e}")
+            logger.info("Database integrity error: %s", e)
             conn.close()
             return {"success": False, "error": "Email already exists"}
         except Error as e:
-            print(f"Error creating user: {e}")
+            logger.error("Error creating user: %s", e)
             conn.close()
             return {"success": False, "error": str(e)}
     else:
         return {"success": False, "error": "Database connection failed"}
 
+@timed_stage("db_query")
 def get_user_by_email(email):
     """Get user data by email"""
     conn = create_connection()
@@ -127,12 +176,13 @@ def get_user_by_email(email):
             else:
                 return None
         except Error as e:
-            print(f"Error getting user: {e}")
+            logger.error("Error getting user: %s", e)
             conn.close()
             return None
     else:
         return None
 
+@timed_stage("db_query")
 def get_all_therapists():
     """Get all therapists from database"""
     conn = create_connection()
@@ -151,7 +201,7 @@ def get_all_therapists():
                 "contact": row[4]
             } for row in rows]
         except Error as e:
-            print(f"Error getting therapists: {e}")
+            logger.error("Error getting therapists: %s", e)
             conn.close()
             return []
     return []
@@ -0,0 +1,97 @@
+import contextvars
+import itertools
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Lower value runs first
+PRIORITY_CRISIS = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+
+
+class GenerationQueue:
+    """
+    Priority queue in front of the model generate calls. Only the CPU/GPU-bound
+    generate step goes through it; Gemini calls stay on the caller's thread.
+    Crisis jobs jump ahead of normal ones, and bulk jobs run last;
+    jobs with equal priority run in FIFO order.
+    """
+
+    def __init__(self, workers=1):
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._workers = []
+        for i in range(workers):
+            worker = threading.Thread(target=self._run, name=f"generation-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, fn, *args, priority=PRIORITY_NORMAL, **kwargs):
+        """Queue fn(*args, **kwargs) and return a Future for its result"""
+        future = Future()
+        # Run in the caller's context so the request id follows the job into the worker thread
+        context = contextvars.copy_context()
+        self._queue.put((priority, next(self._counter), future, context, fn, args, kwargs))
+        return future
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            _, _, future, context, fn, args, kwargs = self._queue.get()
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(context.run(fn, *args, **kwargs))
+                    except Exception as e:
+                        logger.exception("Error in generation job: %s", e)
+                        future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+
+class FollowupStore:
+    """
+    Keeps the Futures of deferred replies so the client can fetch them later.
+    Entries expire after ttl seconds whether or not they were collected.
+    """
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def add(self, future):
+        followup_id = uuid.uuid4().hex
+        with self._lock:
+            self._evict_expired()
+            self._entries[followup_id] = (time.monotonic(), future)
+        return followup_id
+
+    def get(self, followup_id):
+        with self._lock:
+            entry = self._entries.get(followup_id)
+        return entry[1] if entry else None
+
+    def pop(self, followup_id):
+        with self._lock:
+            entry = self._entries.pop(followup_id, None)
+        return entry[1] if entry else None
+
+    def _evict_expired(self):
+        cutoff = time.monotonic() - self.ttl
+        expired = [key for key, (created, _) in self._entries.items() if created < cutoff]
+        for key in expired:
+            del self._entries[key]
+
+
+generation_queue = GenerationQueue(workers=int(os.environ.get("GENERATION_WORKERS", "2")))
+followups = FollowupStore()
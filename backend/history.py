@@ -0,0 +1,186 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from sqlite3 import Error
+
+import database
+from mood_trends import apply_rollups
+from metrics import REGISTRY, Counter, Histogram, track_stage, timed_stage
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+HISTORY_WRITES = REGISTRY.register(Counter(
+    "mental_health_history_rows_written_total",
+    "Conversation history rows committed to SQLite"
+))
+HISTORY_DROPPED = REGISTRY.register(Counter(
+    "mental_health_history_rows_dropped_total",
+    "Conversation history rows dropped because the write-behind queue was full or the write failed"
+))
+HISTORY_BATCH_SIZE = REGISTRY.register(Histogram(
+    "mental_health_history_batch_rows",
+    "Rows per history write transaction",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)
+))
+
+HISTORY_BUSY_TIMEOUT_MS = int(os.environ.get("HISTORY_BUSY_TIMEOUT_MS", "30000"))
+
+INSERT_HISTORY_SQL = """ INSERT INTO conversation_history
+                         (user_id, created_at, message, response, detected_mood,
+                          crisis_detected, crisis_type, crisis_score)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?) """
+
+
+class HistoryWriter:
+    """
+    Write-behind store for chat exchanges. record() only enqueues; a background thread
+    drains the queue and commits rows in batched transactions, so no insert runs on
+    the request thread.
+    """
+
+    def __init__(self, max_queue=10000, max_batch=200, flush_interval=0.5):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, user_id, message, response, detected_mood=None,
+               crisis_detected=False, crisis_type=None, crisis_score=None, created_at=None):
+        """Queue one exchange for persistence; never blocks"""
+        row = (str(user_id), created_at or time.time(), message, response, detected_mood,
+               1 if crisis_detected else 0, crisis_type, crisis_score)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            HISTORY_DROPPED.inc()
+            logger.warning("History queue full, dropping row", extra={"sample_rate": 0.01})
+
+    def close(self, timeout=5):
+        """Flush queued rows and stop the writer thread"""
+        self._stopped.set()
+        self._thread.join(timeout)
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        # Gather whatever else is already queued, up to the batch limit
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        conn = None
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if self._stopped.is_set():
+                    break
+                continue
+
+            if conn is None:
+                conn = database.create_connection()
+                if conn is not None:
+                    # WAL lets /history readers run while the writer commits
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    # Wait out other writers (e.g. a bulk import chunk) instead of failing with "database is locked"
+                    conn.execute(f"PRAGMA busy_timeout={HISTORY_BUSY_TIMEOUT_MS}")
+            if conn is None:
+                HISTORY_DROPPED.inc(len(batch))
+                logger.error("History writer could not connect; dropped %s rows", len(batch))
+                continue
+
+            try:
+                with track_stage("db_write"):
+                    with conn:
+                        conn.executemany(INSERT_HISTORY_SQL, batch)
+                        # Keep the mood rollups in step with the history in the same transaction
+                        apply_rollups(conn, [(row[0], row[1], row[4]) for row in batch])
+                HISTORY_WRITES.inc(len(batch))
+                HISTORY_BATCH_SIZE.observe(len(batch))
+            except Error as e:
+                HISTORY_DROPPED.inc(len(batch))
+                logger.error("Error writing %s history rows: %s", len(batch), e)
+
+        if conn is not None:
+            conn.close()
+
+
+def encode_cursor(created_at, row_id):
+    return f"{created_at!r}_{row_id}"
+
+
+def decode_cursor(cursor):
+    created_at, _, row_id = cursor.partition("_")
+    return float(created_at), int(row_id)
+
+
+@timed_stage("db_query")
+def get_history(user_id, cursor=None, limit=50):
+    """
+    Newest-first page of a user's history using keyset pagination on (created_at, id).
+    Returns {"items": [...], "next_cursor": str or None}.
+    """
+    conn = database.create_connection()
+    if conn is None:
+        return None
+
+    try:
+        cur = conn.cursor()
+        if cursor:
+            before_time, before_id = decode_cursor(cursor)
+            cur.execute("""SELECT id, created_at, message, response, detected_mood,
+                                  crisis_detected, crisis_type, crisis_score
+                           FROM conversation_history
+                           WHERE user_id = ? AND (created_at, id) < (?, ?)
+                           ORDER BY created_at DESC, id DESC LIMIT ?""",
+                        (str(user_id), before_time, before_id, limit + 1))
+        else:
+            cur.execute("""SELECT id, created_at, message, response, detected_mood,
+                                  crisis_detected, crisis_type, crisis_score
+                           FROM conversation_history
+                           WHERE user_id = ?
+                           ORDER BY created_at DESC, id DESC LIMIT ?""",
+                        (str(user_id), limit + 1))
+        rows = cur.fetchall()
+    except Error as e:
+        logger.error("Error reading history: %s", e)
+        return None
+    finally:
+        conn.close()
+
+    # The extra row only tells us whether another page exists
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [{
+        "id": row[0],
+        "timestamp": row[1],
+        "message": row[2],
+        "response": row[3],
+        "detected_mood": row[4],
+        "crisis_detected": bool(row[5]),
+        "crisis_type": row[6],
+        "crisis_score": row[7]
+    } for row in rows]
+
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(rows[-1][1], rows[-1][0]) if has_more and rows else None
+    }
+
+
+history_writer = HistoryWriter(
+    max_batch=int(os.environ.get("HISTORY_MAX_BATCH", "200")),
+    flush_interval=float(os.environ.get("HISTORY_FLUSH_INTERVAL", "0.5")),
+)
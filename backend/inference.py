@@ -0,0 +1,172 @@
+import abc
+import hashlib
+import os
+import time
+import torch
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Directory where the exported ONNX encoder/decoder graphs are cached, one subdirectory per model source
+ONNX_EXPORT_DIR = os.path.join(os.path.dirname(__file__), "models", "onnx_model")
+
+# Which engine runs generate(): "torch" (default) or "onnx"
+DEFAULT_BACKEND = os.environ.get("INFERENCE_BACKEND", "torch").lower()
+
+# Sampling settings the app uses for single and batched generation
+GENERATION_KWARGS = {
+    "max_length": 150,
+    "temperature": 0.8,  # Add some randomness
+    "top_p": 0.92,       # Control diversity
+    "do_sample": True,
+    "repetition_penalty": 2.0,  # Prevent repetition
+    "num_beams": 4,
+    "early_stopping": True,
+    "no_repeat_ngram_size": 2,
+}
+
+
+def build_model_prompt(user_message, emotion=None):
+    """Format input for T5 model with improved prompt"""
+    prompt = (
+        f"Respond in a professional, empathetic, and clear manner to this mental health question:\n\n"
+        f"Question: {user_message}\n\n"
+    )
+
+    if emotion:
+        prompt += f"User emotion: {emotion}\n\n"
+
+    return prompt + "Response:"
+
+
+class InferenceBackend(abc.ABC):
+    """
+    Common interface for the engines that run T5 generation.
+    Every backend takes tokenized input ids and returns generated token ids.
+    """
+    name = "base"
+
+    def __init__(self, tokenizer, device):
+        self.tokenizer = tokenizer
+        self.device = device
+
+    @abc.abstractmethod
+    def generate(self, input_ids, attention_mask=None, **generation_kwargs):
+        """Return generated token ids for the batch"""
+
+
+class TorchBackend(InferenceBackend):
+    """Eager PyTorch T5ForConditionalGeneration.generate"""
+    name = "torch"
+
+    def __init__(self, model, tokenizer, device):
+        super().__init__(tokenizer, device)
+        self.model = model
+
+    def generate(self, input_ids, attention_mask=None, **generation_kwargs):
+        with torch.no_grad():
+            return self.model.generate(
+                input_ids,
+                attention_mask=attention_mask,
+                **generation_kwargs
+            )
+
+
+def onnx_export_dir(model_source, root=ONNX_EXPORT_DIR):
+    """
+    Export cache directory for a model source. Local directories are keyed on their absolute
+    path and hub ids on the id, so switching MODEL_DIR or falling back to t5-small never
+    reuses another model's graphs.
+    """
+    key = os.path.abspath(model_source) if os.path.isdir(model_source) else model_source
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    name = os.path.basename(os.path.normpath(model_source)) or "model"
+    return os.path.join(root, f"{name}-{digest}")
+
+
+class OnnxBackend(InferenceBackend):
+    """
+    CPU-optimized engine: encoder, decoder and decoder-with-past graphs exported
+    to ONNX and run on ONNX Runtime, reusing the past key/value cache between steps.
+    """
+    name = "onnx"
+
+    def __init__(self, ort_model, tokenizer):
+        super().__init__(tokenizer, torch.device("cpu"))
+        self.model = ort_model
+
+    @classmethod
+    def from_model_dir(cls, model_source, tokenizer, export_dir=None):
+        # Import lazily so the torch backend works without onnxruntime installed
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+        export_dir = export_dir or onnx_export_dir(model_source)
+        if os.path.exists(os.path.join(export_dir, "encoder_model.onnx")):
+            logger.info("Loading exported ONNX model from %s", export_dir)
+            ort_model = ORTModelForSeq2SeqLM.from_pretrained(export_dir, use_cache=True)
+        else:
+            logger.info("Exporting %s to ONNX at %s", model_source, export_dir)
+            ort_model = ORTModelForSeq2SeqLM.from_pretrained(
+                model_source,
+                export=True,
+                use_cache=True,
+                provider="CPUExecutionProvider"
+            )
+            os.makedirs(export_dir, exist_ok=True)
+            ort_model.save_pretrained(export_dir)
+        return cls(ort_model, tokenizer)
+
+    def generate(self, input_ids, attention_mask=None, **generation_kwargs):
+        input_ids = input_ids.to("cpu")
+        if attention_mask is not None:
+            attention_mask = attention_mask.to("cpu")
+        with torch.no_grad():
+            return self.model.generate(
+                input_ids,
+                attention_mask=attention_mask,
+                **generation_kwargs
+            )
+
+
+def create_backend(model_data, backend_name=None):
+    """
+    Build the inference backend selected by config (INFERENCE_BACKEND env var).
+    Falls back to the torch backend if the ONNX engine cannot be created.
+    """
+    backend_name = (backend_name or DEFAULT_BACKEND).lower()
+
+    if backend_name == "onnx":
+        try:
+            return OnnxBackend.from_model_dir(model_data["source"], model_data["tokenizer"])
+        except Exception as e:
+            logger.error("Error creating ONNX backend, falling back to torch: %s", e)
+
+    return TorchBackend(model_data["model"], model_data["tokenizer"], model_data["device"])
+
+
+def measure_token_latency(backend, input_ids, attention_mask=None, runs=5, **generation_kwargs):
+    """
+    Run generate() several times and return per-token latency statistics in milliseconds
+    """
+    # Warm up once so graph/session initialization is not counted
+    backend.generate(input_ids, attention_mask=attention_mask, **generation_kwargs)
+
+    timings = []
+    total_tokens = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = backend.generate(input_ids, attention_mask=attention_mask, **generation_kwargs)
+        elapsed = time.perf_counter() - start
+        tokens = max(output.shape[-1] - 1, 1)  # Exclude the decoder start token
+        timings.append(elapsed / tokens)
+        total_tokens += tokens
+
+    timings.sort()
+    return {
+        "backend": backend.name,
+        "runs": runs,
+        "tokens_generated": total_tokens,
+        "mean_ms_per_token": 1000 * sum(timings) / len(timings),
+        "median_ms_per_token": 1000 * timings[len(timings) // 2],
+        "min_ms_per_token": 1000 * timings[0],
+    }
@@ -0,0 +1,66 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson, serializing straight to bytes. Keys are sorted
+    and output is indented in debug mode like the default provider, and datetimes go
+    through its default() so they are still HTTP dates. Unlike the default provider,
+    non-ASCII text is written as UTF-8 rather than \\u escapes, NaN and infinity become
+    null, and integers past 64 bits are parsed as floats. Objects orjson cannot encode
+    (e.g. integers past 64 bits) and documents it cannot parse fall back to the stdlib.
+    """
+
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # Arguments orjson has no equivalent for go through the stdlib encoder
+        if set(kwargs) - {"indent", "sort_keys", "separators", "default"}:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default,
+                                option=self._options(bool(kwargs.get("indent")))).decode("utf-8")
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            return super().loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        except orjson.JSONEncodeError:
+            return super().response(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """Use orjson for jsonify/request.json when it is installed, else keep the stdlib provider"""
+    if orjson is None:
+        logger.info("orjson not installed, using the default JSON provider")
+        return
+    app.json_provider_class = OrjsonProvider
+    app.json = OrjsonProvider(app)
+    logger.info("Using orjson JSON provider")
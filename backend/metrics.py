@@ -0,0 +1,208 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Default latency buckets in seconds, from sub-millisecond keyword checks to slow model/Gemini calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self._function = function
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function):
+        """Read the value from function() at scrape time instead of storing it"""
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+        return super()._samples()
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, plus the +Inf bucket, sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """collector() returns extra metrics (built fresh at scrape time) to render"""
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    "mental_health_stage_duration_seconds",
+    "Time spent in each processing stage",
+    labelnames=("stage",)
+))
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "mental_health_http_request_duration_seconds",
+    "HTTP request latency by endpoint",
+    labelnames=("endpoint", "method", "status")
+))
+GENERATION_RETRIES = REGISTRY.register(Counter(
+    "mental_health_generation_retries_total",
+    "Model generation attempts beyond the first for a single message"
+))
+REPETITION_REJECTIONS = REGISTRY.register(Counter(
+    "mental_health_repetition_rejections_total",
+    "Generated responses rejected as too short or too similar to recent ones"
+))
+FALLBACKS = REGISTRY.register(Counter(
+    "mental_health_fallbacks_total",
+    "Times a fallback response or model was used",
+    labelnames=("kind",)
+))
+MODEL_LOADED = REGISTRY.register(Gauge(
+    "mental_health_model_loaded",
+    "Whether the T5 model is loaded (1) or not (0)"
+))
+GEMINI_AVAILABLE = REGISTRY.register(Gauge(
+    "mental_health_gemini_available",
+    "Whether a Gemini model is configured (1) or not (0)"
+))
+
+
+def track_stage(stage):
+    """Context manager that records the duration of a block under the given stage"""
+    return STAGE_LATENCY.time(stage=stage)
+
+
+def timed_stage(stage):
+    """Decorator that records each call of the function under the given stage"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STAGE_LATENCY.observe(time.perf_counter() - start, stage=stage)
+        return wrapper
+    return decorator
+
+
+def render_metrics():
+    return REGISTRY.render()
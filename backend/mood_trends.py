@@ -0,0 +1,89 @@
+import datetime
+from collections import Counter
+from sqlite3 import Error
+
+import database
+from metrics import timed_stage
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+PERIOD_DAY = "day"
+PERIOD_WEEK = "week"
+PERIODS = (PERIOD_DAY, PERIOD_WEEK)
+
+UPSERT_ROLLUP_SQL = """ INSERT INTO mood_rollups (user_id, period, period_start, mood, count)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT (user_id, period, period_start, mood)
+                        DO UPDATE SET count = count + excluded.count """
+
+
+def period_start(timestamp, period):
+    """UTC start date of the day or (Monday-based) week containing timestamp, as YYYY-MM-DD"""
+    day = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc).date()
+    if period == PERIOD_WEEK:
+        day -= datetime.timedelta(days=day.weekday())
+    return day.isoformat()
+
+
+def apply_rollups(conn, rows):
+    """
+    Add the moods of newly written history rows to the day/week rollups.
+    rows are (user_id, created_at, detected_mood) tuples; runs inside the caller's transaction.
+    """
+    increments = Counter()
+    for user_id, created_at, mood in rows:
+        if not mood:
+            continue
+        for period in PERIODS:
+            increments[(user_id, period, period_start(created_at, period), mood)] += 1
+
+    if increments:
+        conn.executemany(UPSERT_ROLLUP_SQL, [key + (count,) for key, count in increments.items()])
+
+
+@timed_stage("db_query")
+def get_mood_trends(user_id, period=PERIOD_DAY, periods=7, now=None):
+    """
+    Mood counts per period for the last `periods` days/weeks, read from the rollups only,
+    so the cost depends on the window size and not on the length of the history.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {PERIODS}")
+
+    step = datetime.timedelta(days=7 if period == PERIOD_WEEK else 1)
+    current = datetime.date.fromisoformat(period_start(now or datetime.datetime.now().timestamp(), period))
+    starts = [(current - step * i).isoformat() for i in reversed(range(periods))]
+
+    conn = database.create_connection()
+    if conn is None:
+        return None
+    try:
+        cur = conn.cursor()
+        cur.execute("""SELECT period_start, mood, count FROM mood_rollups
+                       WHERE user_id = ? AND period = ? AND period_start >= ?""",
+                    (str(user_id), period, starts[0]))
+        rows = cur.fetchall()
+    except Error as e:
+        logger.error("Error reading mood trends: %s", e)
+        return None
+    finally:
+        conn.close()
+
+    counts_by_start = {start: {} for start in starts}
+    totals = Counter()
+    for start, mood, count in rows:
+        if start in counts_by_start:
+            counts_by_start[start][mood] = count
+            totals[mood] += count
+
+    return {
+        "period": period,
+        "series": [{
+            "period_start": start,
+            "counts": counts,
+            "dominant_mood": max(counts, key=counts.get) if counts else None
+        } for start, counts in counts_by_start.items()],
+        "totals": dict(totals),
+        "dominant_mood": max(totals, key=totals.get) if totals else None
+    }
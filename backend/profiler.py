@@ -0,0 +1,217 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+MODE_SAMPLE = "sample"
+MODE_TORCH = "torch"
+
+# (file, function) of frames where a thread sits parked waiting for work; such threads are not sampled
+IDLE_FRAMES = {
+    ("queue.py", "get"),         # worker loops blocked on queue.Queue/PriorityQueue (generation, history)
+    ("handlers.py", "dequeue"),  # logging QueueListener
+    ("thread.py", "_worker"),    # idle ThreadPoolExecutor workers
+    ("selectors.py", "select"),  # server loop waiting for connections
+}
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_idle(frame):
+    """True if the innermost frame, or its caller (e.g. Condition.wait under queue.get), is an idle wait"""
+    for candidate in (frame, frame.f_back):
+        if candidate is not None and (os.path.basename(candidate.f_code.co_filename),
+                                      candidate.f_code.co_name) in IDLE_FRAMES:
+            return True
+    return False
+
+
+class LiveProfiler:
+    """
+    On-demand profiler for the running process.
+
+    In "sample" mode a background thread snapshots the stack of every busy thread (threads parked
+    waiting for work are skipped) at a fixed interval and aggregates them into collapsed stacks
+    (the input format of flamegraph.pl/speedscope).
+    In "torch" mode each model generate call runs under torch.profiler instead.
+    A session stops after the given number of seconds or after the given number of /chat
+    requests, whichever comes first.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = False
+        self._mode = None
+        self._deadline = None
+        self._requests_left = None
+        self._interval = 0.005
+        self._started_at = None
+        self._finished_at = None
+        self._stacks = Counter()
+        self._samples = 0
+        self._torch_tables = []
+        self._thread = None
+
+    def start(self, mode=MODE_SAMPLE, seconds=None, requests=None, interval=0.005):
+        if mode not in (MODE_SAMPLE, MODE_TORCH):
+            raise ValueError(f"Unknown profiler mode: {mode}")
+        if seconds is None and requests is None:
+            raise ValueError("Either seconds or requests must be given")
+
+        with self._lock:
+            if self._active:
+                raise RuntimeError("A profiling session is already running")
+            previous = self._thread
+
+        # A stopped sampler may still be sleeping; let it exit so two never run at once
+        if previous is not None:
+            previous.join()
+
+        with self._lock:
+            if self._active:
+                raise RuntimeError("A profiling session is already running")
+            self._active = True
+            self._mode = mode
+            self._deadline = time.monotonic() + seconds if seconds else None
+            self._requests_left = requests
+            self._interval = interval
+            self._started_at = time.time()
+            self._finished_at = None
+            self._stacks = Counter()
+            self._samples = 0
+            self._torch_tables = []
+            self._thread = threading.Thread(target=self._run, name="live-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            if self._active:
+                self._active = False
+                self._finished_at = time.time()
+
+    def request_finished(self):
+        """Called after each profiled request; ends the session when the request budget is used"""
+        with self._lock:
+            if not self._active or self._requests_left is None:
+                return
+            self._requests_left -= 1
+            if self._requests_left <= 0:
+                self._active = False
+                self._finished_at = time.time()
+
+    def generate_context(self):
+        """Wrap a model generate call; returns a torch profiler when a torch session is active"""
+        if not (self._active and self._mode == MODE_TORCH):
+            return nullcontext()
+        return _TorchGenerateProfile(self)
+
+    def status(self):
+        with self._lock:
+            return {
+                "active": self._active,
+                "mode": self._mode,
+                "started_at": self._started_at,
+                "finished_at": self._finished_at,
+                "requests_left": self._requests_left,
+                "seconds_left": max(0.0, self._deadline - time.monotonic()) if self._active and self._deadline else None,
+                "samples": self._samples,
+                "torch_profiles": len(self._torch_tables),
+            }
+
+    def collapsed_stacks(self):
+        """Collapsed-stack output: 'root;caller;callee count' per line"""
+        with self._lock:
+            items = self._stacks.most_common()
+        return "\n".join(f"{stack} {count}" for stack, count in items) + ("\n" if items else "")
+
+    def torch_tables(self):
+        with self._lock:
+            return list(self._torch_tables)
+
+    def _add_torch_result(self, table, stacks):
+        with self._lock:
+            self._torch_tables.append(table)
+            self._stacks.update(stacks)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    return
+                if self._deadline is not None and time.monotonic() >= self._deadline:
+                    self._active = False
+                    self._finished_at = time.time()
+                    return
+                mode = self._mode
+
+            if mode == MODE_SAMPLE:
+                self._take_sample(own_id)
+            time.sleep(self._interval)
+
+    def _take_sample(self, own_id):
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or _is_idle(frame):
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.reverse()
+            stacks.append(";".join(labels))
+
+        with self._lock:
+            self._stacks.update(stacks)
+            self._samples += 1
+
+
+class _TorchGenerateProfile:
+    """Context manager running one generate call under torch.profiler"""
+
+    def __init__(self, owner):
+        self._owner = owner
+        self._profile = None
+
+    def __enter__(self):
+        import torch.profiler
+        self._profile = torch.profiler.profile(
+            activities=[torch.profiler.ProfilerActivity.CPU],
+            record_shapes=True,
+            with_stack=True
+        )
+        self._profile.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profile.__exit__(exc_type, exc, tb)
+        try:
+            table = self._profile.key_averages().table(sort_by="cpu_time_total", row_limit=30)
+            stacks = Counter()
+            with tempfile.NamedTemporaryFile(mode="r", suffix=".txt", delete=False) as f:
+                stacks_path = f.name
+            try:
+                self._profile.export_stacks(stacks_path, "self_cpu_time_total")
+                with open(stacks_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        stack, _, value = line.rstrip("\n").rpartition(" ")
+                        if stack:
+                            stacks[stack] += int(value)
+            finally:
+                os.remove(stacks_path)
+            self._owner._add_torch_result(table, stacks)
+        except Exception as e:
+            logger.error("Error collecting torch profile: %s", e)
+        return False
+
+
+live_profiler = LiveProfiler()
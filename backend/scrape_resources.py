@@ -1,12 +1,17 @@
 import requests
 from bs4 import BeautifulSoup
 import os
+from metrics import timed_stage
+from structured_logging import get_logger
 
+logger = get_logger(__name__)
+
+@timed_stage("scraping")
 def scrape_website(url, filename):
     """
     Scrape content from a website and save it to a file
     """
-    print(f"Scraping {url}...")
+    logger.info("Scraping %s", url)
     
     # Send HTTP request
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
@@ -70,10 +75,10 @@ def scrape_website(url, filename):
             with open(filename, 'w', encoding='utf-8') as f:
                 f.write('\n\n'.join(output))
             
-            print(f"Data has been scraped and saved to {filename}")
+            logger.info("Data has been scraped and saved to %s", filename)
             return True
         else:
-            print(f"Failed to retrieve {url}. Status code: {response.status_code}")
+            logger.warning("Failed to retrieve %s. Status code: %s", url, response.status_code)
             
             # Create a placeholder file with error information
             os.makedirs(os.path.dirname(filename), exist_ok=True)
@@ -83,7 +88,7 @@ def scrape_website(url, filename):
             
             return False
     except Exception as e:
-        print(f"Error scraping {url}: {e}")
+        logger.error("Error scraping %s: %s", url, e)
         
         # Create a placeholder file with error information
         os.makedirs(os.path.dirname(filename), exist_ok=True)
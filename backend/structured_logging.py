@@ -0,0 +1,118 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from dotenv import load_dotenv
+
+# Request id of the request being handled, attached to every log record
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+_listener = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds the current request id to each record"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Drops a share of high-volume records. Log with extra={"sample_rate": 0.01}
+    to keep roughly 1% of them; records without a sample_rate always pass.
+    """
+
+    def filter(self, record):
+        rate = getattr(record, "sample_rate", None)
+        return rate is None or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with timestamp, level, logger, request id and extra fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        fields = getattr(record, "fields", None)
+        if fields:
+            # Extra fields never replace the standard keys
+            for key, value in fields.items():
+                entry.setdefault(key, value)
+        return json.dumps(entry, default=str)
+
+
+class RawQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records as they are. The stock QueueHandler.prepare() formats the message and
+    traceback on the calling thread; here the listener thread does all formatting.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = "-"
+        message = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            message += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return message
+
+
+def setup_logging(level=None, log_format=None):
+    """
+    Route all logging through a queue so request threads only enqueue records;
+    a background listener thread formats and writes them to stdout.
+    Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    # Modules log at import time, so pick up LOG_LEVEL/LOG_FORMAT from .env here
+    load_dotenv()
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    log_format = (log_format or os.environ.get("LOG_FORMAT", "json")).lower()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = RawQueueHandler(log_queue)
+    # Filters run in the calling thread so sampled-out records are never queued
+    queue_handler.addFilter(SamplingFilter())
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def get_logger(name):
+    setup_logging()
+    return logging.getLogger(name)
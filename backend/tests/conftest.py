@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# The backend is a flat set of modules; make them importable from the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Importing database initializes it; keep the tests off the checked-in sample.db
+os.environ.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(), "test.db"))
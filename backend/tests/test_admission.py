@@ -0,0 +1,107 @@
+import threading
+import time
+
+from admission import ADMITTED, DEGRADED, SHED, TEMPLATE_ONLY, AdmissionController, TokenBucket
+
+
+def test_token_bucket_allows_burst_then_refills():
+    bucket = TokenBucket(rate=2, capacity=3)
+    now = bucket.updated
+
+    assert [bucket.consume(now)[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = bucket.consume(now)
+    assert not allowed
+    assert retry_after == 0.5
+
+    assert bucket.consume(now + 0.5) == (True, 0)
+
+
+def test_token_bucket_does_not_exceed_capacity():
+    bucket = TokenBucket(rate=1, capacity=2)
+    later = bucket.updated + 100
+
+    assert [bucket.consume(later)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_admits_up_to_max_inflight_and_releases():
+    controller = AdmissionController(max_inflight=2, max_queue=0, client_burst=10)
+
+    first = controller.admit("a")
+    second = controller.admit("b")
+    third = controller.admit("c")
+
+    assert (first.status, second.status) == (ADMITTED, ADMITTED)
+    assert third.status == SHED and third.reason == "queue_full"
+    assert third.retry_after >= 1
+
+    controller.release(first)
+    controller.release(third)
+    assert controller.stats()["inflight"] == 1
+    assert controller.admit("c").status == ADMITTED
+
+
+def test_rate_limited_client_is_shed_without_affecting_others():
+    controller = AdmissionController(max_inflight=10, client_rate=0.01, client_burst=2)
+
+    statuses = [controller.admit("noisy").status for _ in range(3)]
+    other = controller.admit("quiet")
+
+    assert statuses == [ADMITTED, ADMITTED, SHED]
+    assert other.status == ADMITTED
+    assert controller.stats()["shed_by_reason"] == {"rate_limited": 1}
+
+
+def test_queued_request_times_out():
+    controller = AdmissionController(max_inflight=1, max_queue=1, queue_timeout=0.05)
+    controller.admit("a")
+
+    admission = controller.admit("b")
+
+    assert admission.status == SHED and admission.reason == "queue_timeout"
+    stats = controller.stats()
+    assert stats["queued"] == 0
+    assert stats["queue_wait_count"] == 1
+
+
+def test_queued_request_is_admitted_degraded_when_a_slot_frees():
+    controller = AdmissionController(max_inflight=1, max_queue=1, queue_timeout=5)
+    first = controller.admit("a")
+    result = {}
+
+    waiter = threading.Thread(target=lambda: result.setdefault("admission", controller.admit("b")))
+    waiter.start()
+    while controller.stats()["queued"] == 0:
+        time.sleep(0.001)
+    controller.release(first)
+    waiter.join()
+
+    assert result["admission"].status == DEGRADED
+    assert result["admission"].degraded
+    assert controller.stats()["degraded_total"] == 1
+
+
+def test_crisis_uses_reserved_slots_then_gets_template_only():
+    controller = AdmissionController(max_inflight=1, max_queue=0, crisis_slots=2, client_burst=10)
+    controller.admit("a")
+
+    crisis = [controller.admit(f"c{i}", is_crisis=True) for i in range(3)]
+
+    assert [a.status for a in crisis] == [ADMITTED, ADMITTED, TEMPLATE_ONLY]
+    assert crisis[2].template_only and crisis[2].reason == "capacity"
+    assert not any(a.shed for a in crisis)
+    stats = controller.stats()
+    assert stats["inflight"] == 3
+    assert stats["crisis_template_only_by_reason"] == {"capacity": 1}
+
+    controller.release(crisis[2])
+    assert controller.stats()["inflight"] == 3
+
+
+def test_crisis_requests_are_charged_to_the_client_bucket():
+    controller = AdmissionController(max_inflight=10, client_rate=0.01, client_burst=2)
+
+    statuses = [controller.admit("a", is_crisis=True) for _ in range(3)]
+
+    assert [a.status for a in statuses] == [ADMITTED, ADMITTED, TEMPLATE_ONLY]
+    assert statuses[2].reason == "rate_limited"
+    assert controller.admit("a").status == SHED
@@ -0,0 +1,80 @@
+import pytest
+
+import auth
+import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "test.db"))
+    database.init_db()
+
+
+def test_token_round_trip_carries_only_uid_and_jti():
+    token = auth.issue_token({"id": 7, "email": "a@example.com", "name": "A"})
+
+    payload = auth.verify_token(token)
+
+    assert set(payload) == {"uid", "jti"}
+    assert payload["uid"] == 7
+
+
+def test_tokens_get_distinct_ids():
+    user = {"id": 7, "email": "a@example.com", "name": "A"}
+
+    assert auth.verify_token(auth.issue_token(user))["jti"] != auth.verify_token(auth.issue_token(user))["jti"]
+
+
+def test_tampered_token_is_rejected():
+    token = auth.issue_token({"id": 7, "email": "a@example.com", "name": "A"})
+
+    assert auth.verify_token(token[:-2] + ("AA" if not token.endswith("AA") else "BB")) is None
+    assert auth.verify_token("not a token") is None
+
+
+def test_expired_token_is_rejected(monkeypatch):
+    token = auth.issue_token({"id": 7, "email": "a@example.com", "name": "A"})
+    monkeypatch.setattr(auth, "TOKEN_TTL", -1)
+
+    assert auth.verify_token(token) is None
+    assert auth.revoke_token(token) is False
+
+
+def test_revoked_token_is_rejected_and_others_still_work():
+    user = {"id": 7, "email": "a@example.com", "name": "A"}
+    revoked, other = auth.issue_token(user), auth.issue_token(user)
+
+    assert auth.revoke_token(revoked) is True
+
+    assert auth.verify_token(revoked) is None
+    assert auth.verify_token(other)["uid"] == 7
+    assert auth.revoke_token("not a token") is False
+
+
+def test_revocation_cache_prunes_expired_entries_when_full():
+    cache = auth.RevocationCache(max_entries=2)
+    cache.revoke("old", expires_at=0)
+    cache.revoke("live", expires_at=float("inf"))
+
+    cache.revoke("new", expires_at=float("inf"))
+
+    assert not cache.is_revoked("old")
+    assert cache.is_revoked("live") and cache.is_revoked("new")
+
+
+def test_authenticate(db):
+    user_id = database.create_user("a@example.com", "secret", "A")["user_id"]
+
+    assert auth.authenticate("a@example.com", "secret") == {"id": user_id, "email": "a@example.com", "name": "A"}
+    assert auth.authenticate("a@example.com", "wrong") is None
+    assert auth.authenticate("nobody@example.com", "secret") is None
+
+
+@pytest.mark.parametrize("header, token", [
+    ("Bearer abc.def", "abc.def"),
+    ("Bearer  abc ", "abc"),
+    ("Basic abc", None),
+    (None, None),
+])
+def test_token_from_header(header, token):
+    assert auth.token_from_header(header) == token
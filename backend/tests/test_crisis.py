@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from crisis import CRISIS_KEYWORDS, CrisisMatcher
+from crisis_eval import evaluate, parse_line
+
+
+def reference_detect_crisis(message, crisis_keywords=CRISIS_KEYWORDS):
+    """The original per-keyword loop that CrisisMatcher replaced"""
+    message = message.lower()
+    detected_categories = []
+    max_score = 0
+    for category, keywords in crisis_keywords.items():
+        for keyword in keywords:
+            if keyword in message:
+                score = 0.7
+                if category == 'immediate_danger' or any(danger in message for danger in crisis_keywords['immediate_danger']):
+                    score = 0.9
+                detected_categories.append(category)
+                max_score = max(max_score, score)
+    is_crisis = len(detected_categories) > 0
+    crisis_type = ', '.join(set(detected_categories)) if detected_categories else None
+    return (is_crisis, crisis_type, max_score)
+
+
+def crisis_categories(crisis_type):
+    return set(crisis_type.split(', ')) if crisis_type else set()
+
+
+MESSAGES = [
+    "I'm feeling anxious today",
+    "I want to die",
+    "I AM GOING TO KILL MYSELF TONIGHT",
+    "sometimes I cut myself and want to end my life",
+    "I think about suicide right now",
+    "they attack me at school",
+    "I might hurt someone, I plan to",
+    "what are you going to do this weekend?",
+    "I'm better off dead",
+    "selfharm is not self harm",
+    "",
+]
+
+
+@pytest.mark.parametrize("message", MESSAGES + [keyword for keywords in CRISIS_KEYWORDS.values() for keyword in keywords])
+def test_matcher_agrees_with_reference(message):
+    is_crisis, crisis_type, score = CrisisMatcher().detect(message)
+    expected_crisis, expected_type, expected_score = reference_detect_crisis(message)
+
+    assert is_crisis == expected_crisis
+    assert crisis_categories(crisis_type) == crisis_categories(expected_type)
+    assert score == expected_score
+
+
+def test_parse_line_rejects_malformed_records():
+    assert parse_line(b'{"text": "I Want To Die", "labels": "suicide"}', tsv=False) == ("i want to die", {"suicide"})
+    assert parse_line(b"suicide,self_harm\tHello", tsv=True) == ("hello", {"suicide", "self_harm"})
+
+    for line in [b'[1, 2]', b'"text"', b'{"text": null}', b'{"text": "x", "labels": [["a"]]}',
+                 b'{"text": "x", "labels": {"a": 1}}', b'not json']:
+        with pytest.raises(ValueError):
+            parse_line(line, tsv=False)
+
+
+def test_evaluate_counts_malformed_lines_as_parse_errors(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    lines = [json.dumps({"text": "I want to die", "labels": ["suicide"]}), "[1, 2]", '{"text": null}',
+             json.dumps({"text": "x", "labels": [["a"]]}), json.dumps({"text": "hello", "labels": []})]
+    corpus.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    report = evaluate(str(corpus), [CRISIS_KEYWORDS], workers=2)
+
+    assert report["messages"] == 2
+    assert report["parse_errors"] == 3
@@ -0,0 +1,64 @@
+import pytest
+
+import database
+from history import INSERT_HISTORY_SQL, decode_cursor, encode_cursor, get_history
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "test.db"))
+    database.init_db()
+    conn = database.create_connection()
+    yield conn
+    conn.close()
+
+
+def insert_rows(conn, rows):
+    with conn:
+        conn.executemany(INSERT_HISTORY_SQL, [
+            (user_id, created_at, message, f"reply to {message}", None, 0, None, None)
+            for user_id, created_at, message in rows
+        ])
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(1700000000.123456, 42)) == (1700000000.123456, 42)
+
+
+def test_pages_newest_first_without_gaps_or_duplicates(db):
+    # Rows 3 and 4 share a timestamp, so paging must fall back to the id
+    insert_rows(db, [("1", 100.0, "m0"), ("1", 101.0, "m1"), ("1", 102.0, "m2"),
+                     ("1", 103.0, "m3"), ("1", 103.0, "m4"), ("2", 104.0, "other user")])
+
+    messages = []
+    cursor = None
+    pages = 0
+    while True:
+        page = get_history("1", cursor=cursor, limit=2)
+        messages += [item["message"] for item in page["items"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert messages == ["m4", "m3", "m2", "m1", "m0"]
+    assert pages == 3
+
+
+def test_last_full_page_has_no_next_cursor(db):
+    insert_rows(db, [("1", 100.0, "m0"), ("1", 101.0, "m1")])
+
+    page = get_history("1", limit=2)
+
+    assert [item["message"] for item in page["items"]] == ["m1", "m0"]
+    assert page["next_cursor"] is None
+
+
+def test_unknown_user_gets_empty_page(db):
+    assert get_history("nobody") == {"items": [], "next_cursor": None}
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "1700000000.5", "1700000000.5_x"])
+def test_bad_cursor_raises_value_error(db, cursor):
+    with pytest.raises(ValueError):
+        get_history("1", cursor=cursor)
@@ -0,0 +1,89 @@
+import os
+import sys
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("optimum.onnxruntime")
+
+from transformers import T5ForConditionalGeneration, T5Tokenizer
+
+import inference
+from benchmark_inference import PARITY_CONFIGS, check_parity
+from inference import InferenceBackend, OnnxBackend, TorchBackend, build_model_prompt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from tiny_model import build_tiny_model
+
+
+TOKENIZER_CORPUS = [
+    build_model_prompt(message, emotion)
+    for message in ["I'm feeling anxious today", "I can't sleep and my thoughts keep racing",
+                    "How do I talk to my family about my depression?", "Work has been really stressful lately"]
+    for emotion in ["Neutral", "Anxious", "Sad"]
+]
+
+
+@pytest.fixture(scope="module")
+def tiny_model_dir(tmp_path_factory):
+    """Tiny random-weight T5 with a small locally trained tokenizer, so no model download is needed"""
+    sentencepiece = pytest.importorskip("sentencepiece")
+    tokenizer_dir = tmp_path_factory.mktemp("tokenizer")
+    model_prefix = str(tokenizer_dir / "spiece")
+    sentencepiece.SentencePieceTrainer.train(
+        sentence_iterator=iter(TOKENIZER_CORPUS), model_prefix=model_prefix, vocab_size=64,
+        pad_id=0, eos_id=1, unk_id=2, bos_id=-1, minloglevel=2
+    )
+    T5Tokenizer(vocab_file=model_prefix + ".model", extra_ids=0, legacy=False).save_pretrained(str(tokenizer_dir))
+    return build_tiny_model(str(tmp_path_factory.mktemp("tiny_t5")), tokenizer_source=str(tokenizer_dir))
+
+
+@pytest.fixture(scope="module")
+def backends(tiny_model_dir, tmp_path_factory):
+    tokenizer = T5Tokenizer.from_pretrained(tiny_model_dir, legacy=False)
+    model = T5ForConditionalGeneration.from_pretrained(tiny_model_dir)
+    model.eval()
+    export_dir = str(tmp_path_factory.mktemp("onnx"))
+    torch_backend = TorchBackend(model, tokenizer, torch.device("cpu"))
+    onnx_backend = OnnxBackend.from_model_dir(tiny_model_dir, tokenizer, export_dir=export_dir)
+    return torch_backend, onnx_backend, tokenizer, export_dir
+
+
+@pytest.mark.parametrize("config_name", sorted(PARITY_CONFIGS))
+def test_onnx_matches_torch(backends, config_name):
+    torch_backend, onnx_backend, tokenizer, _ = backends
+
+    assert check_parity(torch_backend, onnx_backend, tokenizer, seed=42, config_name=config_name) == []
+
+
+def test_export_cache_is_reused(backends, tiny_model_dir):
+    torch_backend, onnx_backend, tokenizer, export_dir = backends
+    assert os.path.exists(os.path.join(export_dir, "encoder_model.onnx"))
+
+    cached = OnnxBackend.from_model_dir(tiny_model_dir, tokenizer, export_dir=export_dir)
+    inputs = tokenizer(build_model_prompt("I can't sleep", "Anxious"), return_tensors="pt")
+    kwargs = PARITY_CONFIGS["greedy"]
+
+    assert torch.equal(cached.generate(inputs.input_ids, attention_mask=inputs.attention_mask, **kwargs),
+                       onnx_backend.generate(inputs.input_ids, attention_mask=inputs.attention_mask, **kwargs))
+
+
+def test_export_dir_depends_on_model_source(tiny_model_dir, tmp_path):
+    other = tmp_path / "other_model"
+    other.mkdir()
+
+    assert inference.onnx_export_dir(tiny_model_dir) == inference.onnx_export_dir(tiny_model_dir + os.sep)
+    assert inference.onnx_export_dir(tiny_model_dir) != inference.onnx_export_dir(str(other))
+    assert inference.onnx_export_dir("t5-small") != inference.onnx_export_dir("t5-base")
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        InferenceBackend(None, None)
+
+
+def test_prompt_includes_emotion_only_when_given():
+    assert "User emotion: Sad" in build_model_prompt("hello", "Sad")
+    assert "User emotion" not in build_model_prompt("hello")
@@ -0,0 +1,120 @@
+import datetime
+import gzip
+
+import pytest
+from flask import Flask, jsonify, request
+
+import json_provider
+from compression import init_compression
+from json_provider import OrjsonProvider, init_json_provider
+
+orjson = pytest.importorskip("orjson")
+
+
+def make_app():
+    app = Flask(__name__)
+    init_json_provider(app)
+    init_compression(app, min_size=1024)
+
+    @app.route("/echo", methods=["POST"])
+    def echo():
+        return jsonify(request.json)
+
+    @app.route("/items")
+    def items():
+        return jsonify({"items": [{"id": i, "name": f"item {i}"} for i in range(200)], "count": 200})
+
+    @app.route("/big")
+    def big():
+        return jsonify(value=2 ** 70)
+
+    @app.route("/when")
+    def when():
+        return jsonify(at=datetime.datetime(2024, 5, 15, 12, 30, tzinfo=datetime.timezone.utc))
+
+    @app.route("/status")
+    def status():
+        return jsonify(success=True, error=None)
+
+    return app
+
+
+def test_jsonify_uses_orjson_provider():
+    app = make_app()
+    assert isinstance(app.json, OrjsonProvider)
+
+    response = app.test_client().get("/status")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+    assert response.data == b'{"error":null,"success":true}\n'
+
+
+def test_request_json_round_trip():
+    payload = {"message": "héllo", "nested": {"b": 2, "a": [1, 2.5, None]}}
+
+    response = make_app().test_client().post("/echo", json=payload)
+
+    assert response.status_code == 200
+    assert response.get_json() == payload
+
+
+def test_debug_mode_indents_output():
+    app = make_app()
+    app.debug = True
+
+    response = app.test_client().get("/status")
+
+    assert response.data == b'{\n  "error": null,\n  "success": true\n}\n'
+
+
+def test_large_response_is_gzipped_when_accepted():
+    client = make_app().test_client()
+
+    plain = client.get("/items")
+    compressed = client.get("/items", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in plain.headers
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert gzip.decompress(compressed.data) == plain.data
+
+
+def test_small_response_is_not_compressed():
+    response = make_app().test_client().get("/status", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+
+
+def test_falls_back_to_default_provider_without_orjson(monkeypatch):
+    monkeypatch.setattr(json_provider, "orjson", None)
+    app = make_app()
+
+    assert not isinstance(app.json, OrjsonProvider)
+    assert app.test_client().get("/status").get_json() == {"success": True, "error": None}
+
+
+def test_integers_past_64_bits_fall_back_to_stdlib():
+    app = make_app()
+
+    response = app.test_client().get("/big")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"value": 2 ** 70}
+    with app.app_context():
+        assert app.json.dumps([2 ** 70]) == "[1180591620717411303424]"
+
+
+def test_datetimes_are_http_dates_like_the_default_provider():
+    response = make_app().test_client().get("/when")
+
+    assert response.get_json() == {"at": "Wed, 15 May 2024 12:30:00 GMT"}
+
+
+def test_unparseable_documents_fall_back_to_stdlib():
+    app = make_app()
+
+    with app.app_context():
+        assert app.json.loads('{"a": Infinity}') == {"a": float("inf")}
+        with pytest.raises(ValueError):
+            app.json.loads("not json")
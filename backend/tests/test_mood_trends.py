@@ -0,0 +1,71 @@
+import datetime
+
+import pytest
+
+import database
+from mood_trends import PERIOD_DAY, PERIOD_WEEK, apply_rollups, get_mood_trends, period_start
+
+
+def ts(year, month, day, hour=12):
+    return datetime.datetime(year, month, day, hour, tzinfo=datetime.timezone.utc).timestamp()
+
+
+# Wednesday
+NOW = ts(2024, 5, 15)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "test.db"))
+    database.init_db()
+    conn = database.create_connection()
+    yield conn
+    conn.close()
+
+
+def write(conn, rows):
+    with conn:
+        apply_rollups(conn, rows)
+
+
+def test_period_start_uses_monday_weeks():
+    assert period_start(NOW, PERIOD_DAY) == "2024-05-15"
+    assert period_start(NOW, PERIOD_WEEK) == "2024-05-13"
+    assert period_start(ts(2024, 5, 13, 0), PERIOD_WEEK) == "2024-05-13"
+
+
+def test_daily_series_covers_the_window(db):
+    write(db, [("1", ts(2024, 5, 15), "Happy"), ("1", ts(2024, 5, 15), "Sad"), ("1", ts(2024, 5, 15), "Sad"),
+               ("1", ts(2024, 5, 13), "Happy"), ("1", ts(2024, 5, 1), "Angry"), ("1", ts(2024, 5, 15), None)])
+
+    trends = get_mood_trends("1", period=PERIOD_DAY, periods=3, now=NOW)
+
+    assert [p["period_start"] for p in trends["series"]] == ["2024-05-13", "2024-05-14", "2024-05-15"]
+    assert [p["counts"] for p in trends["series"]] == [{"Happy": 1}, {}, {"Happy": 1, "Sad": 2}]
+    assert [p["dominant_mood"] for p in trends["series"]] == ["Happy", None, "Sad"]
+    assert trends["totals"] == {"Happy": 2, "Sad": 2}
+
+
+def test_rollups_accumulate_across_writes(db):
+    write(db, [("1", ts(2024, 5, 13), "Sad")])
+    write(db, [("1", ts(2024, 5, 15), "Sad"), ("1", ts(2024, 5, 14), "Happy")])
+
+    trends = get_mood_trends("1", period=PERIOD_WEEK, periods=2, now=NOW)
+
+    assert trends["series"] == [
+        {"period_start": "2024-05-06", "counts": {}, "dominant_mood": None},
+        {"period_start": "2024-05-13", "counts": {"Sad": 2, "Happy": 1}, "dominant_mood": "Sad"},
+    ]
+    assert trends["dominant_mood"] == "Sad"
+
+
+def test_trends_are_per_user(db):
+    write(db, [("1", NOW, "Happy"), ("2", NOW, "Sad")])
+
+    assert get_mood_trends("2", now=NOW)["totals"] == {"Sad": 1}
+    assert get_mood_trends("3", now=NOW)["dominant_mood"] is None
+
+
+def test_unknown_period_is_rejected(db):
+    with pytest.raises(ValueError):
+        get_mood_trends("1", period="month")
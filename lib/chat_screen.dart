@@ -283,8 +283,12 @@ class ChatScreenState extends State<ChatScreen>
           return botResponse;
         }
 
-        // Rest of your existing code...
-        
+        // Crisis fast path: the personalized reply arrives as a follow-up
+        final followupId = data['followup_id'] as String?;
+        if (followupId != null) {
+          _pollFollowup(baseUrl, followupId);
+        }
+
         return botResponse;
       } else {
         throw Exception('Failed to load response: ${response.statusCode}');
@@ -298,6 +302,30 @@ class ChatScreenState extends State<ChatScreen>
     }
   }
 
+  Future<void> _pollFollowup(String baseUrl, String followupId) async {
+    // Long-poll the backend until the deferred reply is ready
+    for (int attempt = 0; attempt < 6; attempt++) {
+      try {
+        final response = await http
+            .get(Uri.parse('$baseUrl/chat/followup/$followupId?wait=20'))
+            .timeout(const Duration(seconds: 25));
+
+        if (response.statusCode == 200) {
+          final data = jsonDecode(response.body);
+          final followupText = data['response'] as String?;
+          if (mounted && followupText != null && followupText.isNotEmpty) {
+            _addBotMessage(followupText);
+          }
+          return;
+        } else if (response.statusCode != 202) {
+          return;
+        }
+      } catch (e) {
+        print('Error fetching follow-up reply: $e');
+      }
+    }
+  }
+
   Future<void> _testBackendConnection() async {
     // Show a loading indicator
     ScaffoldMessenger.of(context).showSnackBar(